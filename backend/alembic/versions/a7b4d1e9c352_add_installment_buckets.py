@@ -0,0 +1,57 @@
+"""add_installment_buckets
+
+Revision ID: a7b4d1e9c352
+Revises: f6a3c9d2e8b1
+Create Date: 2026-10-17 17:41:08.925113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b4d1e9c352'
+down_revision: Union[str, None] = 'f6a3c9d2e8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('installment_buckets',
+    sa.Column('product_id', sa.UUID(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['financial_products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'year', 'month')
+    )
+    op.create_index('ix_installment_buckets_user_period', 'installment_buckets', ['user_id', 'year', 'month'], unique=False, postgresql_include=['amount', 'transaction_count'])
+
+    # Backfill from existing installment expenses (months in UTC, as the app buckets them)
+    op.execute("""
+        INSERT INTO installment_buckets (product_id, year, month, user_id, amount, transaction_count, updated_at)
+        SELECT
+            from_product_id,
+            EXTRACT(YEAR FROM date AT TIME ZONE 'UTC')::int,
+            EXTRACT(MONTH FROM date AT TIME ZONE 'UTC')::int,
+            user_id,
+            SUM(amount),
+            COUNT(*),
+            now()
+        FROM transactions
+        WHERE installment_id IS NOT NULL
+          AND transaction_type = 'EXPENSE'
+          AND from_product_id IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_installment_buckets_user_period', table_name='installment_buckets', postgresql_include=['amount', 'transaction_count'])
+    op.drop_table('installment_buckets')
@@ -0,0 +1,50 @@
+"""add_transaction_query_indexes
+
+Revision ID: b8e5f2a6d913
+Revises: a7b4d1e9c352
+Create Date: 2026-10-17 18:52:33.471209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e5f2a6d913'
+down_revision: Union[str, None] = 'a7b4d1e9c352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside a transaction; builds don't block writes
+    with op.get_context().autocommit_block():
+        op.create_index('ix_transactions_user_date_id', 'transactions', ['user_id', 'date', 'id'], unique=False, postgresql_include=['transaction_type', 'amount'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_transactions_user_type_date', 'transactions', ['user_id', 'transaction_type', 'date', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_transactions_from_product_date', 'transactions', ['from_product_id', 'date', 'id'], unique=False, postgresql_where=sa.text('from_product_id IS NOT NULL'), postgresql_include=['transaction_type', 'amount'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_transactions_to_product_date', 'transactions', ['to_product_id', 'date'], unique=False, postgresql_where=sa.text('to_product_id IS NOT NULL'), postgresql_include=['transaction_type', 'amount'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_transactions_category_date', 'transactions', ['category_id', 'date', 'id'], unique=False, postgresql_where=sa.text('category_id IS NOT NULL'), postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_transactions_user_installments', 'transactions', ['user_id', 'installment_id'], unique=False, postgresql_where=sa.text('installment_id IS NOT NULL'), postgresql_include=['from_product_id', 'installment_total', 'installment_number', 'amount', 'date'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_transactions_installment', 'transactions', ['installment_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+        # ix_transactions_user_date is a prefix of ix_transactions_user_date_id;
+        # ix_transactions_installment_id (from index=True) duplicated
+        # ix_transactions_installment
+        op.drop_index('ix_transactions_user_date', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_installment_id', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+
+    op.execute('ANALYZE transactions')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_transactions_installment_id', 'transactions', ['installment_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_transactions_user_date', 'transactions', ['user_id', 'date'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_transactions_user_installments', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_category_date', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_to_product_date', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_from_product_date', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_user_type_date', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_user_date_id', table_name='transactions', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,35 @@
+"""add_cache_entries_table
+
+Revision ID: c3e8f1a2d467
+Revises: b7d2e4a91c05
+Create Date: 2026-10-17 11:04:19.552310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8f1a2d467'
+down_revision: Union[str, None] = 'b7d2e4a91c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('cache_entries',
+    sa.Column('namespace', sa.String(length=255), nullable=False),
+    sa.Column('key', sa.Text(), nullable=False),
+    sa.Column('value', sa.LargeBinary(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('namespace', 'key'),
+    prefixes=['UNLOGGED']
+    )
+    op.create_index('ix_cache_entries_expires_at', 'cache_entries', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cache_entries_expires_at', table_name='cache_entries')
+    op.drop_table('cache_entries')
@@ -0,0 +1,66 @@
+"""key_summaries_on_product_period
+
+Revision ID: c4f7a2e9b615
+Revises: b8e5f2a6d913
+Create Date: 2026-10-17 21:14:08.552931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f7a2e9b615'
+down_revision: Union[str, None] = 'b8e5f2a6d913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The old key included the nullable institution_id, and NULLs never
+    # conflict, so cards without an institution could get several summaries
+    # per period. Fold those into one (closed/paid first, then the oldest):
+    # adjustments and items not already on it move over, and it is flagged
+    # for reconciliation since its totals no longer match.
+    op.execute("""
+        CREATE TEMP TABLE summary_duplicates ON COMMIT DROP AS
+        SELECT id, keeper_id FROM (
+            SELECT id, first_value(id) OVER (
+                PARTITION BY product_id, year, month
+                ORDER BY status = 'DRAFT', created_at, id
+            ) AS keeper_id
+            FROM credit_card_summaries
+        ) ranked
+        WHERE id <> keeper_id
+    """)
+    op.execute("""
+        UPDATE summary_adjustments a SET summary_id = d.keeper_id
+        FROM summary_duplicates d WHERE a.summary_id = d.id
+    """)
+    op.execute("""
+        UPDATE summary_items i SET summary_id = d.keeper_id
+        FROM summary_duplicates d
+        WHERE i.summary_id = d.id
+          AND NOT EXISTS (
+              SELECT 1 FROM summary_items k
+              WHERE k.summary_id = d.keeper_id AND k.transaction_id = i.transaction_id
+          )
+    """)
+    op.execute("""
+        UPDATE credit_card_summaries s SET needs_reconciliation = true
+        WHERE s.id IN (SELECT keeper_id FROM summary_duplicates)
+    """)
+    op.execute("""
+        DELETE FROM credit_card_summaries s
+        USING summary_duplicates d WHERE s.id = d.id
+    """)
+
+    op.drop_constraint('uq_summary_institution_product_year_month', 'credit_card_summaries', type_='unique')
+    op.create_unique_constraint('uq_summary_product_year_month', 'credit_card_summaries', ['product_id', 'year', 'month'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_summary_product_year_month', 'credit_card_summaries', type_='unique')
+    op.create_unique_constraint('uq_summary_institution_product_year_month', 'credit_card_summaries', ['institution_id', 'product_id', 'year', 'month'])
@@ -0,0 +1,29 @@
+"""add_cache_entry_tags
+
+Revision ID: d91a5c7e3b28
+Revises: c3e8f1a2d467
+Create Date: 2026-10-17 11:48:02.113905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91a5c7e3b28'
+down_revision: Union[str, None] = 'c3e8f1a2d467'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('cache_entries', sa.Column('tags', postgresql.ARRAY(sa.Text()), server_default='{}', nullable=False))
+    op.create_index('ix_cache_entries_tags', 'cache_entries', ['tags'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cache_entries_tags', table_name='cache_entries', postgresql_using='gin')
+    op.drop_column('cache_entries', 'tags')
@@ -0,0 +1,90 @@
+"""add_balance_ledger
+
+Revision ID: e5f2b8c4a1d9
+Revises: d91a5c7e3b28
+Create Date: 2026-10-17 13:22:47.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f2b8c4a1d9'
+down_revision: Union[str, None] = 'd91a5c7e3b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('balance_ledger',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('product_id', sa.UUID(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('effective_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('reason', sa.String(length=20), nullable=False),
+    sa.Column('transaction_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['financial_products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_balance_ledger_product_effective', 'balance_ledger', ['product_id', 'effective_at'], unique=False)
+    op.create_table('balance_snapshots',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('product_id', sa.UUID(), nullable=False),
+    sa.Column('as_of', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('last_entry_id', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['financial_products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id', 'as_of', name='uq_balance_snapshot_product_as_of')
+    )
+
+    # Backfill: one entry per existing balance effect, the way TransactionService
+    # applies them (debit card expenses hit the linked account; installment
+    # purchases move the balance by the full amount on the first installment date)
+    op.execute("""
+        INSERT INTO balance_ledger (product_id, amount, effective_at, reason, transaction_id, created_at)
+        SELECT product_id, amount, effective_at, 'TRANSACTION', transaction_id, now()
+        FROM (
+            SELECT
+                CASE
+                    WHEN t.transaction_type = 'EXPENSE' AND p.product_type = 'DEBIT_CARD'
+                         AND p.linked_product_id IS NOT NULL THEN p.linked_product_id
+                    ELSE p.id
+                END AS product_id,
+                -t.amount AS amount,
+                CASE
+                    WHEN t.installment_id IS NULL THEN t.date
+                    ELSE MIN(t.date) OVER (PARTITION BY t.installment_id)
+                END AS effective_at,
+                t.id AS transaction_id
+            FROM transactions t
+            JOIN financial_products p ON p.id = t.from_product_id
+            WHERE t.transaction_type IN ('EXPENSE', 'TRANSFER')
+            UNION ALL
+            SELECT t.to_product_id, t.amount, t.date, t.id
+            FROM transactions t
+            WHERE t.to_product_id IS NOT NULL AND t.transaction_type IN ('INCOME', 'TRANSFER')
+        ) effects
+    """)
+    # Opening entries absorb whatever the transactions don't explain
+    # (initial balances, past manual edits), so the ledger matches today
+    op.execute("""
+        INSERT INTO balance_ledger (product_id, amount, effective_at, reason, created_at)
+        SELECT p.id, COALESCE(p.balance, 0) - COALESCE(l.total, 0), COALESCE(p.created_at, now()), 'OPENING', now()
+        FROM financial_products p
+        LEFT JOIN (
+            SELECT product_id, SUM(amount) AS total FROM balance_ledger GROUP BY product_id
+        ) l ON l.product_id = p.id
+        WHERE COALESCE(p.balance, 0) - COALESCE(l.total, 0) <> 0
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('balance_snapshots')
+    op.drop_index('ix_balance_ledger_product_effective', table_name='balance_ledger')
+    op.drop_table('balance_ledger')
@@ -0,0 +1,26 @@
+"""add_summary_needs_reconciliation
+
+Revision ID: f6a3c9d2e8b1
+Revises: e5f2b8c4a1d9
+Create Date: 2026-10-17 16:05:12.318842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a3c9d2e8b1'
+down_revision: Union[str, None] = 'e5f2b8c4a1d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('credit_card_summaries', sa.Column('needs_reconciliation', sa.Boolean(), server_default='false', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('credit_card_summaries', 'needs_reconciliation')
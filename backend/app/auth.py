@@ -1,11 +1,12 @@
+import asyncio
+import hashlib
 import os
-import httpx
-import jwt
-from fastapi import HTTPException, Security, Depends
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, Header, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jwt.algorithms import RSAAlgorithm
 import json
-from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 from app.config import settings
 
 # JWT Configuration
@@ -20,17 +21,217 @@ def get_auth_config():
         "audience": settings.CLERK_AUDIENCE,
     }
 
-@lru_cache()
-def get_jwks_client():
-    return httpx.Client()
+_FORCE = object()
+
+
+class JWKSCache:
+    """
+    In-process cache of parsed JWKS public keys, keyed by kid.
+    
+    - Keys younger than `ttl * REFRESH_AHEAD` are served as-is.
+    - Older keys are still served while one background task refreshes them.
+    - Past `ttl` the refresh happens inline before answering.
+    - An unknown kid (key rotation) forces a refresh, at most once every
+      `min_refresh_interval` seconds so bogus tokens can't hammer the IdP.
+    - After a failed fetch no new one is attempted for
+      `min_refresh_interval` seconds, doubling with each consecutive
+      failure (up to `ttl`); the keys we have keep being served meanwhile.
+    
+    Concurrent misses share a single fetch (single-flight via a lock).
+    """
+    
+    REFRESH_AHEAD = 0.8
+    
+    def __init__(self, url: str, ttl: int = 3600, min_refresh_interval: int = 30):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at: Optional[float] = None
+        self._failed_at: Optional[float] = None
+        self._failures = 0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+    
+    async def get_key(self, kid: Optional[str]) -> Optional[Any]:
+        """Get the public key for `kid`, fetching the JWKS only when needed."""
+        fetched_at = self._fetched_at
+        age = time.monotonic() - fetched_at if fetched_at is not None else float("inf")
+        key = self._keys.get(kid)
+        
+        if key is not None:
+            if age < self.ttl * self.REFRESH_AHEAD:
+                return key
+            if age < self.ttl:
+                self._schedule_refresh()
+                return key
+        elif age < self.min_refresh_interval:
+            # Just refreshed and the kid is still unknown
+            return None
+        
+        await self.refresh(seen_fetched_at=fetched_at)
+        return self._keys.get(kid)
+    
+    async def refresh(self, seen_fetched_at: Any = _FORCE) -> None:
+        """
+        Fetch and parse the JWKS. Concurrent callers share one request:
+        pass the fetch time you observed and the call is a no-op if
+        someone else refreshed in the meantime, or if a recent fetch failed.
+        """
+        async with self._lock:
+            if seen_fetched_at is not _FORCE:
+                if self._fetched_at != seen_fetched_at:
+                    return
+                if self._backing_off():
+                    self._keep_keys()
+                    return
+            
+            # Deferred: only needed when keys are (re)fetched
+            from jwt.algorithms import RSAAlgorithm
+            from app.http_client import request
+            
+            try:
+                response = await request("GET", self.url)
+                error = None if response.status_code == 200 else f"Status: {response.status_code}"
+            except Exception as e:  # httpx.HTTPError; httpx itself is imported lazily
+                error = str(e) or type(e).__name__
+            if error:
+                self._failed_at = time.monotonic()
+                self._failures += 1
+                print(f"Auth Error: Could not fetch JWKS from {self.url}. {error}")
+                self._keep_keys()
+                return
+            
+            self._keys = {
+                key_data["kid"]: RSAAlgorithm.from_jwk(json.dumps(key_data))
+                for key_data in response.json()["keys"]
+                if key_data.get("kid")
+            }
+            self._fetched_at = time.monotonic()
+            self._failed_at = None
+            self._failures = 0
+    
+    def _backing_off(self) -> bool:
+        """True while the last failed fetch is too recent to retry."""
+        if self._failed_at is None:
+            return False
+        delay = min(self.min_refresh_interval * 2 ** (self._failures - 1), self.ttl)
+        return time.monotonic() - self._failed_at < delay
+    
+    def _keep_keys(self) -> None:
+        """Keep serving the keys we have; without any, auth can't proceed."""
+        if not self._keys:
+            raise HTTPException(status_code=500, detail="Failed to fetch auth keys")
+    
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+    
+    async def _background_refresh(self) -> None:
+        try:
+            await self.refresh(seen_fetched_at=self._fetched_at)
+        except Exception as e:
+            print(f"Auth Warning: Background JWKS refresh failed: {e}")
+
+
+_jwks_caches: Dict[str, JWKSCache] = {}
+
+
+def get_jwks_cache(url: str) -> JWKSCache:
+    """Get the process-wide JWKS cache for a URL."""
+    if url not in _jwks_caches:
+        _jwks_caches[url] = JWKSCache(url, ttl=settings.CLERK_JWKS_CACHE_TTL)
+    return _jwks_caches[url]
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of recently verified tokens: sha256(token) -> (sub, exp).
+    
+    A burst of parallel requests carrying the same token pays for the
+    signature check once. Entries are dropped once the token expires, so a
+    hit never extends a token's validity.
+    """
+    
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+    
+    def get(self, token: str) -> Optional[str]:
+        """Return the cached subject for a still-valid token, else None."""
+        digest = self._digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        sub, exp = entry
+        if exp <= time.time():
+            del self._entries[digest]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return sub
+    
+    def put(self, token: str, sub: str, exp: Optional[float]) -> None:
+        """Remember a verified token until its expiry."""
+        if not exp:
+            return  # Never cache tokens without an expiry
+        digest = self._digest(token)
+        self._entries[digest] = (sub, float(exp))
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+verified_tokens = VerifiedTokenCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE)
+
+
+def verify_cron_secret(authorization: str = Header(default="")) -> None:
+    """Only the scheduler (or a local dev setup) may use operational endpoints."""
+    if not settings.CRON_SECRET:
+        if settings.APP_ENV == "development":
+            return
+        raise HTTPException(status_code=503, detail="CRON_SECRET is not configured")
+    if authorization != f"Bearer {settings.CRON_SECRET}":
+        raise HTTPException(status_code=401, detail="Invalid cron secret")
+
 
 async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Security(security)) -> str:
     """
     Verifies the Clerk JWT and returns the user ID.
     """
+    import jwt  # Deferred to the first authenticated request
+    
     token = credentials.credentials
     config = get_auth_config()
     
+    # Fast path: token already verified recently
+    cached_sub = verified_tokens.get(token)
+    if cached_sub is not None:
+        return cached_sub
+    
     try:
         # Decode headers to get the key ID
         unverified_headers = jwt.get_unverified_header(token)
@@ -40,22 +241,9 @@ async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Securi
         if config["pem_public_key"]:
             key = config["pem_public_key"]
         
-        # Method 2: Fetch from JWKS (Resilient)
+        # Method 2: JWKS, served from the in-process key cache
         elif config["jwks_url"]:
-            # Note: In production, you should cache this!
-            async with httpx.AsyncClient() as client:
-                response = await client.get(config["jwks_url"])
-                if response.status_code != 200:
-                    print(f"Auth Error: Could not fetch JWKS from {config['jwks_url']}. Status: {response.status_code}")
-                    raise HTTPException(status_code=500, detail="Failed to fetch auth keys")
-                jwks = response.json()
-                
-            public_key = None
-            for key_data in jwks["keys"]:
-                if key_data["kid"] == kid:
-                    public_key = RSAAlgorithm.from_jwk(json.dumps(key_data))
-                    break
-            
+            public_key = await get_jwks_cache(config["jwks_url"]).get_key(kid)
             if not public_key:
                 print(f"Auth Error: No matching key found in JWKS for kid: {kid}")
                 raise HTTPException(status_code=401, detail="Invalid token key ID")
@@ -95,6 +283,7 @@ async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Securi
             **decode_options
         )
         
+        verified_tokens.put(token, payload["sub"], payload.get("exp"))
         return payload["sub"]
         
     except jwt.ExpiredSignatureError:
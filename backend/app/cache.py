@@ -1,106 +1,230 @@
 """Simple in-memory cache for frequently accessed data."""
 
+import asyncio
+import hashlib
+import heapq
+import inspect
+import json
+import pickle
+import sys
 import time
-from typing import TypeVar, Generic, Optional, Dict, Any
-from dataclasses import dataclass
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import TypeVar, Generic, Optional, Dict, Any, Iterable, List, Set, Tuple
 from functools import wraps
+from uuid import UUID
 
 T = TypeVar('T')
 
 
-@dataclass
 class CacheEntry(Generic[T]):
     """Cache entry with TTL."""
-    value: T
-    expires_at: float
+    __slots__ = ("value", "expires_at", "size", "tags")
+    
+    def __init__(self, value: T, expires_at: float, size: int = 0, tags: Tuple[str, ...] = ()):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tags = tags
 
 
 class SimpleCache(Generic[T]):
     """
     Simple in-memory cache with TTL support.
     
+    Optionally bounded by number of entries and/or approximate size in
+    bytes; when full, the least recently used entries are evicted. Expiry
+    times are kept in a min-heap, so a cleanup pass only touches the keys
+    that actually expired.
+    
+    Entries can carry tags (e.g. "user:<id>"); a reverse index from tag to
+    keys lets invalidate_tags() drop them without scanning the cache.
+    
     Usage:
-        cache = SimpleCache[str](ttl=300)  # 5 minutes
-        cache.set("key", "value")
+        cache = SimpleCache[str](ttl=300, max_entries=1000)  # 5 minutes
+        cache.set("key", "value", tags=["user:42"])
         value = cache.get("key")
+        cache.invalidate_tags(["user:42"])
     """
     
-    def __init__(self, ttl: int = 300, cleanup_interval: int = 60):
+    def __init__(
+        self,
+        ttl: int = 300,
+        cleanup_interval: int = 60,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
         """
         Initialize cache.
         
         Args:
             ttl: Time to live in seconds (default: 300 = 5 minutes)
             cleanup_interval: How often to cleanup expired entries (default: 60 seconds)
+            max_entries: Maximum number of entries (default: unbounded)
+            max_bytes: Approximate maximum size of keys + values, measured
+                with sys.getsizeof (shallow) (default: unbounded)
         """
-        self._cache: Dict[str, CacheEntry[T]] = {}
+        self._cache: "OrderedDict[str, CacheEntry[T]]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._tag_index: Dict[str, Set[str]] = {}
         self._ttl = ttl
         self._cleanup_interval = cleanup_interval
         self._last_cleanup = time.time()
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
     
-    def _cleanup_if_needed(self) -> None:
+    def _cleanup_if_needed(self, force: bool = False) -> None:
         """Remove expired entries if cleanup interval has passed."""
         now = time.time()
-        if now - self._last_cleanup < self._cleanup_interval:
+        if not force and now - self._last_cleanup < self._cleanup_interval:
             return
         
-        expired_keys = [
-            key for key, entry in self._cache.items()
-            if entry.expires_at < now
-        ]
-        for key in expired_keys:
-            del self._cache[key]
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._cache.get(key)
+            # Heap items are not removed on overwrite/delete; skip stale ones
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key)
+                self.expirations += 1
+        
+        # Stale heap items pile up when keys are overwritten; compact them
+        if len(heap) > 2 * len(self._cache) + 64:
+            self._expiry_heap = [(entry.expires_at, key) for key, entry in self._cache.items()]
+            heapq.heapify(self._expiry_heap)
         
         self._last_cleanup = now
     
+    def _remove(self, key: str) -> CacheEntry[T]:
+        entry = self._cache.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+        return entry
+    
+    def _evict_if_needed(self) -> None:
+        """Evict least recently used entries until within limits."""
+        if not self._over_limits():
+            return
+        # Dropping expired entries first avoids evicting live ones
+        self._cleanup_if_needed(force=True)
+        while self._cache and self._over_limits():
+            self._remove(next(iter(self._cache)))
+            self.evictions += 1
+    
+    def _over_limits(self) -> bool:
+        return (
+            (self._max_entries is not None and len(self._cache) > self._max_entries) or
+            (self._max_bytes is not None and self._bytes > self._max_bytes)
+        )
+    
     def get(self, key: str) -> Optional[T]:
         """Get value from cache if not expired."""
         self._cleanup_if_needed()
         
         entry = self._cache.get(key)
         if entry is None:
+            self.misses += 1
             return None
         
         if entry.expires_at < time.time():
-            del self._cache[key]
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
             return None
         
+        self._cache.move_to_end(key)
+        self.hits += 1
         return entry.value
     
-    def set(self, key: str, value: T, ttl: Optional[int] = None) -> None:
-        """Store value in cache."""
+    def set(
+        self,
+        key: str,
+        value: T,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Store value in cache, optionally tagged for invalidate_tags()."""
         ttl = ttl or self._ttl
         expires_at = time.time() + ttl
-        self._cache[key] = CacheEntry(value=value, expires_at=expires_at)
+        size = sys.getsizeof(key) + sys.getsizeof(value) if self._max_bytes is not None else 0
+        tags = tuple(tags) if tags else ()
+        
+        if key in self._cache:
+            self._remove(key)
+        self._cache[key] = CacheEntry(value, expires_at, size, tags)
+        self._bytes += size
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+        
+        self._evict_if_needed()
     
     def delete(self, key: str) -> bool:
         """Delete entry from cache. Returns True if key existed."""
         if key in self._cache:
-            del self._cache[key]
+            self._remove(key)
             return True
         return False
     
     def clear(self) -> None:
         """Clear all cache entries."""
         self._cache.clear()
+        self._expiry_heap.clear()
+        self._tag_index.clear()
+        self._bytes = 0
     
-    def get_many(self, keys: list[str]) -> Dict[str, T]:
+    def get_many(self, keys: List[str]) -> Dict[str, T]:
         """Get multiple values from cache."""
-        return {
-            key: self.get(key) 
-            for key in keys 
-            if self.get(key) is not None
-        }
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
     
-    def set_many(self, items: Dict[str, T], ttl: Optional[int] = None) -> None:
+    def set_many(
+        self,
+        items: Dict[str, T],
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
         """Store multiple values in cache."""
+        tags = tuple(tags) if tags else ()
         for key, value in items.items():
-            self.set(key, value, ttl)
+            self.set(key, value, ttl, tags)
+    
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        Invalidate all entries carrying any of the given tags.
+        Returns number of keys invalidated.
+        """
+        keys_to_delete = set()
+        for tag in tags:
+            keys_to_delete.update(self._tag_index.get(tag, ()))
+        for key in keys_to_delete:
+            self._remove(key)
+        return len(keys_to_delete)
     
     def invalidate_pattern(self, pattern: str) -> int:
         """
         Invalidate all keys matching a pattern.
         Returns number of keys invalidated.
+        
+        Scans every key; prefer invalidate_tags() for hot paths.
         """
         import re
         regex = re.compile(pattern)
@@ -109,73 +233,664 @@ class SimpleCache(Generic[T]):
             if regex.search(key)
         ]
         for key in keys_to_delete:
-            del self._cache[key]
+            self._remove(key)
         return len(keys_to_delete)
+    
+    def __len__(self) -> int:
+        return len(self._cache)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "bytes": self._bytes if self._max_bytes is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# ============== Backends ==============
+
+class CacheBackend(ABC):
+    """
+    Async interface implemented by every cache backend.
+    
+    get_cache() hands out instances of the backend selected by
+    settings.CACHE_BACKEND, so callers don't know where values live.
+    
+    Tags are global: on the shared backends, invalidate_tags() drops
+    matching entries from every namespace, not just this one.
+    """
+    
+    def __init__(self, namespace: str, ttl: int = 300):
+        self.namespace = namespace
+        self.ttl = ttl
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value if present and not expired."""
+    
+    @abstractmethod
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Store value, optionally tagged for invalidate_tags()."""
+    
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Delete entry. Returns True if key existed."""
+    
+    @abstractmethod
+    async def clear(self) -> None:
+        """Clear every entry in this namespace."""
+    
+    @abstractmethod
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Delete entries carrying any of the tags. Returns number deleted."""
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get multiple values."""
+        found = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+    
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Store multiple values."""
+        tags = tuple(tags) if tags else ()
+        for key, value in items.items():
+            await self.set(key, value, ttl, tags)
 
 
-# Global cache instance (use carefully in multi-process environments)
-_cache_instances: Dict[str, SimpleCache[Any]] = {}
+class MemoryBackend(CacheBackend):
+    """Process-local backend on top of SimpleCache (not shared across instances)."""
+    
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int = 300,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        super().__init__(namespace, ttl)
+        self.cache = SimpleCache[Any](ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+    
+    async def get(self, key: str) -> Optional[Any]:
+        return self.cache.get(key)
+    
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        self.cache.set(key, value, ttl, tags)
+    
+    async def delete(self, key: str) -> bool:
+        return self.cache.delete(key)
+    
+    async def clear(self) -> None:
+        self.cache.clear()
+    
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        return self.cache.invalidate_tags(tags)
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        return self.cache.get_many(keys)
 
 
-def get_cache(name: str, ttl: int = 300) -> SimpleCache[Any]:
-    """Get or create a named cache instance."""
+class PostgresBackend(CacheBackend):
+    """
+    Shared backend on the UNLOGGED cache_entries table.
+    
+    Unlogged tables skip the WAL, so writes are cheap; their contents are
+    lost on a database crash, which is fine for a cache. Values are
+    pickled: only store data this application produced.
+    
+    Each operation checks out its own pooled connection rather than
+    joining the caller's transaction; the serverless pool keeps a second
+    warm connection for it (see app.database.engine_options).
+    """
+    
+    # Purge expired rows every this many writes
+    PURGE_EVERY = 500
+    
+    def __init__(self, namespace: str, ttl: int = 300):
+        super().__init__(namespace, ttl)
+        self._writes = 0
+    
+    @staticmethod
+    def _table():
+        from app.models import CacheRecord
+        return CacheRecord.__table__
+    
+    async def get(self, key: str) -> Optional[Any]:
+        return (await self.get_many([key])).get(key)
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        from sqlalchemy import select, func
+        from app.database import engine
+        
+        if not keys:
+            return {}
+        table = self._table()
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                select(table.c.key, table.c.value)
+                .where(
+                    table.c.namespace == self.namespace,
+                    table.c.key.in_(keys),
+                    table.c.expires_at > func.now(),
+                )
+            )
+            return {key: pickle.loads(value) for key, value in result}
+    
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        await self.set_many({key: value}, ttl, tags)
+    
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        from app.database import engine
+        
+        if not items:
+            return
+        table = self._table()
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl or self.ttl)
+        tags = list(tags) if tags else []
+        rows = [
+            {
+                "namespace": self.namespace,
+                "key": key,
+                "value": pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                "expires_at": expires_at,
+                "tags": tags,
+            }
+            for key, value in items.items()
+        ]
+        stmt = pg_insert(table)
+        async with engine.begin() as conn:
+            await conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[table.c.namespace, table.c.key],
+                    set_={
+                        "value": stmt.excluded.value,
+                        "expires_at": stmt.excluded.expires_at,
+                        "tags": stmt.excluded.tags,
+                    },
+                ),
+                rows,
+            )
+            self._writes += len(rows)
+            if self._writes >= self.PURGE_EVERY:
+                self._writes = 0
+                await conn.execute(table.delete().where(table.c.expires_at <= datetime.now(timezone.utc)))
+    
+    async def delete(self, key: str) -> bool:
+        from app.database import engine
+        
+        table = self._table()
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                table.delete().where(table.c.namespace == self.namespace, table.c.key == key)
+            )
+            return result.rowcount > 0
+    
+    async def clear(self) -> None:
+        from app.database import engine
+        
+        table = self._table()
+        async with engine.begin() as conn:
+            await conn.execute(table.delete().where(table.c.namespace == self.namespace))
+    
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        from app.database import engine
+        
+        tags = list(tags)
+        if not tags:
+            return 0
+        table = self._table()
+        async with engine.begin() as conn:
+            # && (overlap) is served by the GIN index on tags
+            result = await conn.execute(table.delete().where(table.c.tags.overlap(tags)))
+            return result.rowcount
+
+
+class RedisBackend(CacheBackend):
+    """
+    Shared backend for any Redis-protocol server (Redis, Valkey, KeyDB...).
+    
+    Requires the optional `redis` package. Values are pickled: only store
+    data this application produced. Each tag is a set of the keys carrying
+    it; tag sets live as long as their longest-lived member (Redis >= 7 for
+    EXPIRE NX/GT).
+    """
+    
+    _clients: Dict[str, Any] = {}
+    
+    def __init__(self, namespace: str, ttl: int = 300, url: str = "redis://localhost:6379/0"):
+        super().__init__(namespace, ttl)
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+        
+        if url not in self._clients:
+            self._clients[url] = redis_asyncio.Redis.from_url(url)
+        self.client = self._clients[url]
+    
+    def _key(self, key: str) -> str:
+        return f"banquito:{self.namespace}:{key}"
+    
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"banquito:tag:{tag}"
+    
+    def _add_tags(self, pipe, full_keys: List[str], tags: Iterable[str], ttl: int) -> None:
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            pipe.sadd(tag_key, *full_keys)
+            pipe.expire(tag_key, ttl, nx=True)
+            pipe.expire(tag_key, ttl, gt=True)
+    
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self._key(key))
+        return pickle.loads(raw) if raw is not None else None
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        raws = await self.client.mget([self._key(key) for key in keys])
+        return {key: pickle.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+    
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        await self.set_many({key: value}, ttl, tags)
+    
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        if not items:
+            return
+        ttl = ttl or self.ttl
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(self._key(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=ttl)
+            if tags:
+                self._add_tags(pipe, [self._key(key) for key in items], tags, ttl)
+            await pipe.execute()
+    
+    async def delete(self, key: str) -> bool:
+        return bool(await self.client.delete(self._key(key)))
+    
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(match=self._key("*"), count=500)]
+        if keys:
+            await self.client.delete(*keys)
+    
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return 0
+        # Read and drop the tag sets atomically so no concurrent add is lost
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.sunion(tag_keys)
+            pipe.delete(*tag_keys)
+            members, _ = await pipe.execute()
+        # Members may have expired already; count what was actually deleted
+        return await self.client.delete(*members) if members else 0
+
+
+# Global cache instances, one per name. Only the memory backend is
+# process-local; pick a shared one via settings.CACHE_BACKEND.
+_cache_instances: Dict[str, CacheBackend] = {}
+
+# Process-local caches of cached() sync functions (they can't use a backend)
+_local_caches: List[SimpleCache] = []
+
+# Bumped by invalidate_tags(); cached() discards results of calls that were
+# already running when an invalidation happened
+_invalidation_epoch = 0
+
+
+def get_cache(
+    name: str,
+    ttl: int = 300,
+    max_entries: Optional[int] = 10_000,
+    max_bytes: Optional[int] = None,
+    local: bool = False,
+) -> CacheBackend:
+    """
+    Get or create a named cache instance on the configured backend.
+    
+    max_entries/max_bytes only bound the memory backend; shared backends
+    rely on TTLs (and the server's own eviction policy). local=True always
+    uses the memory backend, for hot per-request lookups where a network
+    round trip would cost more than the miss it saves.
+    """
     if name not in _cache_instances:
-        _cache_instances[name] = SimpleCache[Any](ttl=ttl)
+        from app.config import settings
+        
+        backend = "memory" if local else settings.CACHE_BACKEND
+        if backend == "memory":
+            _cache_instances[name] = MemoryBackend(name, ttl, max_entries=max_entries, max_bytes=max_bytes)
+        elif backend == "postgres":
+            _cache_instances[name] = PostgresBackend(name, ttl)
+        elif backend == "redis":
+            _cache_instances[name] = RedisBackend(name, ttl, url=settings.CACHE_REDIS_URL)
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND '{backend}' (expected memory, postgres or redis)")
     return _cache_instances[name]
 
 
-def cached(ttl: int = 300, key_prefix: str = ""):
+async def invalidate_tags(tags: Iterable[str]) -> int:
+    """
+    Invalidate every cached entry carrying any of the tags, in all caches.
+    Returns number of entries invalidated.
+    
+    Tag conventions: "user:<user id>" for anything derived from a user's
+    data, "product:<product id>" for a single product's balance/history.
+    """
+    global _invalidation_epoch
+    from app.config import settings
+    
+    tags = list(dict.fromkeys(tags))
+    if not tags:
+        return 0
+    _invalidation_epoch += 1
+    
+    total = sum(cache.invalidate_tags(tags) for cache in _local_caches)
+    for cache in list(_cache_instances.values()):
+        if isinstance(cache, MemoryBackend):
+            total += await cache.invalidate_tags(tags)
+    if settings.CACHE_BACKEND != "memory":
+        # Shared backends index tags across namespaces, so one call also
+        # covers caches this process never opened
+        total += await get_cache("invalidation").invalidate_tags(tags)
+    return total
+
+
+# ============== Keys ==============
+
+# Parameters with these annotations are request plumbing, not inputs
+_INJECTED_TYPES = {"AsyncSession", "Session", "Request", "Response", "BackgroundTasks", "WebSocket"}
+
+# Parameters tied to the calling request: a call taking one can't run on
+# behalf of other callers or after the caller returned
+_SESSION_TYPES = {"AsyncSession", "Session"}
+
+
+def _key_value(value: Any) -> Any:
+    """
+    Reduce an argument to plain JSON data that is the same in every process.
+    
+    Values are tagged with their type so e.g. UUID("...") and the string
+    "..." don't collide. Raises TypeError for anything without a stable
+    representation (its str() would typically embed a memory address).
+    """
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return ["f", repr(value)]
+    if isinstance(value, UUID):
+        return ["uuid", value.hex]
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, (date, dt_time)):
+        return [type(value).__name__, value.isoformat()]
+    if isinstance(value, timedelta):
+        return ["td", value.total_seconds()]
+    if isinstance(value, Decimal):
+        # normalize() so 1.50 and 1.5 share a key
+        return ["dec", str(value.normalize())]
+    if isinstance(value, Enum):
+        return ["enum", type(value).__name__, _key_value(value.value)]
+    if isinstance(value, bytes):
+        return ["b", value.hex()]
+    if isinstance(value, (list, tuple)):
+        return [_key_value(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return ["set", sorted((_key_value(item) for item in value), key=_dump)]
+    if isinstance(value, dict):
+        items = [[_key_value(k), _key_value(v)] for k, v in value.items()]
+        return ["dict", sorted(items, key=lambda item: _dump(item[0]))]
+    
+    # Pydantic models (schemas)
+    model_dump = getattr(value, "model_dump", None)
+    if callable(model_dump):
+        return [type(value).__name__, _key_value(model_dump(mode="json"))]
+    
+    # Persistent ORM instances are identified by their primary key
+    state = getattr(value, "_sa_instance_state", None)
+    if state is not None and state.identity is not None:
+        return [type(value).__name__, _key_value(list(state.identity))]
+    
+    raise TypeError(
+        f"Can't build a cache key from {type(value).__name__}; "
+        f"exclude the argument with key_args=..."
+    )
+
+
+def _dump(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def _annotation_name(param: inspect.Parameter) -> str:
+    annotation = param.annotation
+    name = annotation if isinstance(annotation, str) else getattr(annotation, "__name__", "")
+    return name.rsplit(".", 1)[-1]
+
+
+def _is_injected(param: inspect.Parameter) -> bool:
+    """True for self/cls, DB sessions, requests and FastAPI Depends() params."""
+    if param.name in ("self", "cls"):
+        return True
+    if hasattr(param.default, "dependency"):  # fastapi.Depends(...)
+        return True
+    return _annotation_name(param) in _INJECTED_TYPES
+
+
+def _uses_session(func) -> bool:
+    """True if func takes a DB session, or self (a service holding one)."""
+    return any(
+        name == "self" or _annotation_name(param) in _SESSION_TYPES
+        for name, param in inspect.signature(func).parameters.items()
+    )
+
+
+def key_params(func, key_args: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Names of the parameters that make up cache keys for func.
+    
+    Defaults to every parameter except injected ones (see _is_injected);
+    key_args selects them explicitly.
+    """
+    parameters = inspect.signature(func).parameters
+    if key_args is None:
+        return [name for name, param in parameters.items() if not _is_injected(param)]
+    
+    names = list(key_args)
+    unknown = [name for name in names if name not in parameters]
+    if unknown:
+        raise ValueError(f"{func.__qualname__} has no parameters {unknown}")
+    return names
+
+
+def make_cache_key(prefix: str, arguments: Dict[str, Any]) -> str:
+    """
+    Build a compact cache key: the readable prefix plus a 128-bit BLAKE2b
+    digest of the typed, canonical encoding of arguments.
+    """
+    payload = _dump([[name, _key_value(value)] for name, value in sorted(arguments.items())])
+    digest = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    return f"{prefix}:{digest}"
+
+
+def cached(
+    ttl: int = 300,
+    key_prefix: str = "",
+    max_entries: Optional[int] = 1024,
+    stale_ttl: int = 0,
+    tags: Optional[Iterable[str]] = None,
+    key_args: Optional[Iterable[str]] = None,
+):
     """
     Decorator to cache function results.
     
+    Keys are built from the call's arguments bound by parameter name (so
+    f(x) and f(x=x) share one entry) and hashed with make_cache_key().
+    self/cls, DB sessions, requests and Depends() parameters are left
+    out; pass key_args to list the participating parameters explicitly.
+    
+    tags are format strings filled from the call's arguments (by
+    parameter name); invalidate_tags() with a matching tag drops the
+    cached result.
+    
+    For async functions, concurrent calls that miss the same key share a
+    single execution instead of each running the function. With
+    stale_ttl > 0, a value that expired less than stale_ttl seconds ago is
+    still returned while one background call refreshes it
+    (stale-while-revalidate).
+    
+    Functions taking a DB session (or self, which may hold one) get
+    neither: the session belongs to the calling request, so each miss or
+    stale hit is recomputed in the caller's own call. Open a session
+    inside the function to get coalescing and background refresh.
+    
     Usage:
-        @cached(ttl=600, key_prefix="products")
+        @cached(ttl=600, key_prefix="products", stale_ttl=60, tags=["user:{user_id}"])
         async def get_products(user_id: UUID):
-            # expensive operation
-            return products
+            async with AsyncSessionLocal() as db:
+                # expensive operation
+                return products
     """
-    cache = SimpleCache[Any](ttl=ttl)
+    # Values are stored as (result, fresh_until) and kept for the stale window too.
+    # Async functions use the configured backend (resolved on first call);
+    # sync functions can't await it and keep a process-local cache.
+    local_cache = SimpleCache[Any](ttl=ttl + stale_ttl, max_entries=max_entries)
+    _local_caches.append(local_cache)
+    backends: Dict[str, CacheBackend] = {}
+    # key -> (shared call, invalidation epoch it started in)
+    in_flight: Dict[str, Tuple[asyncio.Future, int]] = {}
+    tag_templates = tuple(tags) if tags else ()
     
     def decorator(func):
+        cache_name = f"cached:{key_prefix}:{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+        params = key_params(func, key_args)
+        shared = not _uses_session(func)
+        prefix = f"{key_prefix}:{func.__qualname__}" if key_prefix else func.__qualname__
+        
+        def backend() -> CacheBackend:
+            if cache_name not in backends:
+                backends[cache_name] = get_cache(cache_name, ttl + stale_ttl, max_entries=max_entries)
+            return backends[cache_name]
+        
+        def bind(args, kwargs) -> Tuple[str, List[str]]:
+            """Cache key and tags for a call."""
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            cache_key = make_cache_key(prefix, {name: arguments[name] for name in params})
+            return cache_key, [tag.format(**arguments) for tag in tag_templates]
+        
+        def current_epoch() -> int:
+            return _invalidation_epoch if tag_templates else 0
+        
+        async def compute(cache_key: str, tags: List[str], epoch: int, args, kwargs) -> Any:
+            result = await func(*args, **kwargs)
+            # Don't store what may predate a write that invalidated our tags
+            if epoch == current_epoch():
+                await backend().set(cache_key, (result, time.time() + ttl), ttl + stale_ttl, tags)
+            return result
+        
+        def start(cache_key: str, tags: List[str], args, kwargs) -> asyncio.Future:
+            """Start (or join) the single in-flight call for a key."""
+            epoch = current_epoch()
+            running = in_flight.get(cache_key)
+            # A call started before an invalidation may return old data
+            if running is not None and running[1] == epoch:
+                return running[0]
+            task = asyncio.ensure_future(compute(cache_key, tags, epoch, args, kwargs))
+            in_flight[cache_key] = (task, epoch)
+            task.add_done_callback(lambda t: finish(cache_key, t))
+            return task
+        
+        def finish(cache_key: str, task: asyncio.Future) -> None:
+            running = in_flight.get(cache_key)
+            if running is not None and running[0] is task:
+                del in_flight[cache_key]
+            if not task.cancelled():
+                task.exception()  # Mark background failures as retrieved
+        
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            # Generate cache key
-            key_parts = [key_prefix, func.__name__]
-            key_parts.extend(str(arg) for arg in args)
-            key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
-            cache_key = ":".join(key_parts)
+            cache_key, tags = bind(args, kwargs)
             
-            # Try to get from cache
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                return cached_value
+            entry = await backend().get(cache_key)
+            if entry is not None:
+                value, fresh_until = entry
+                if time.time() < fresh_until:
+                    return value
+                if shared:
+                    # Stale: serve it and let one background call refresh it
+                    start(cache_key, tags, args, kwargs)
+                    return value
             
-            # Execute function
-            result = await func(*args, **kwargs)
-            
-            # Store in cache
-            cache.set(cache_key, result, ttl)
+            if not shared:
+                return await compute(cache_key, tags, current_epoch(), args, kwargs)
             
-            return result
+            # Shield so a cancelled caller doesn't cancel the shared call
+            return await asyncio.shield(start(cache_key, tags, args, kwargs))
         
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
-            # Generate cache key
-            key_parts = [key_prefix, func.__name__]
-            key_parts.extend(str(arg) for arg in args)
-            key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
-            cache_key = ":".join(key_parts)
+            cache_key, tags = bind(args, kwargs)
             
             # Try to get from cache
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                return cached_value
+            entry = local_cache.get(cache_key)
+            if entry is not None and time.time() < entry[1]:
+                return entry[0]
             
             # Execute function
             result = func(*args, **kwargs)
             
             # Store in cache
-            cache.set(cache_key, result, ttl)
+            local_cache.set(cache_key, (result, time.time() + ttl), ttl + stale_ttl, tags)
             
             return result
         
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -36,6 +37,29 @@ class Settings(BaseSettings):
         url = re.sub(r'[?&]$', '', url)
         return url
     
+    # What startup does with the database (app.main.prepare_database):
+    # create_all (create missing tables), check (compare the Alembic
+    # revision, one query), trust (nothing) or auto (create_all in
+    # development, else check)
+    STARTUP_MODE: str = "auto"
+    
+    # Connection pool (app.database.engine_options)
+    # DB_POOL_MODE: queue (long-running server), serverless (one warm
+    # connection kept across invocations, two with CACHE_BACKEND=postgres),
+    # null (connect per checkout) or auto (serverless on Vercel, else queue)
+    DB_POOL_MODE: str = "auto"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 270  # Below Neon's 5 minute idle suspend
+    DB_POOL_PRE_PING: bool = True
+    # Behind PgBouncer in transaction mode (Neon's "-pooler" hosts) named
+    # prepared statements can't be cached per connection. None: detect from host
+    DB_PGBOUNCER: Optional[bool] = None
+    DB_DIRECT_TLS: bool = False  # TLS without the SSLRequest round trip (PostgreSQL 17+)
+    DB_CONNECT_TELEMETRY: bool = False  # Also time DNS separately (one extra lookup per connect)
+    VERCEL: bool = False  # Set by the Vercel runtime
+    
     # CORS
     FRONTEND_URL: str = "https://banquito.vercel.app"
     ALLOWED_ORIGINS: list[str] = ["https://banquito.vercel.app", "http://localhost:5173", "http://localhost:3000"]
@@ -56,11 +80,31 @@ class Settings(BaseSettings):
     CLERK_ISSUER: str = "https://brief-bee-17.clerk.accounts.dev"
     CLERK_JWKS_URL: str = "https://brief-bee-17.clerk.accounts.dev/.well-known/jwks.json"
     CLERK_AUDIENCE: str = ""
+    CLERK_JWKS_CACHE_TTL: int = 3600  # Seconds before cached signing keys are refreshed
+    AUTH_TOKEN_CACHE_SIZE: int = 1024  # Recently verified tokens kept in memory
     
     # Telegram Bot
     TELEGRAM_BOT_TOKEN: str = ""
     TELEGRAM_SECRET_TOKEN: str = ""
     
+    # Outbound HTTP (app.http_client): one pooled client for Telegram and JWKS
+    HTTP_TIMEOUT: float = 10.0  # Seconds per read/write/pool wait
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE: int = 10  # Idle connections kept open for reuse
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0  # Seconds an idle connection is kept
+    HTTP_MAX_RETRIES: int = 3  # Retries on 429 Too Many Requests
+    HTTP_RETRY_BACKOFF: float = 0.5  # Base delay when the server gives no retry_after
+    HTTP_MAX_RETRY_DELAY: float = 10.0  # Longer waits return the 429 instead
+    
+    # Background jobs
+    CRON_SECRET: str = ""  # Sent by Vercel Cron as "Authorization: Bearer <secret>"
+    JOBS_TIME_BUDGET_SECONDS: float = 50.0  # Stay under the serverless function timeout
+    
+    # Cache (app.cache.get_cache): memory, postgres or redis
+    CACHE_BACKEND: str = "memory"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
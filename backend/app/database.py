@@ -1,12 +1,134 @@
+import asyncio
+import logging
 import ssl
 import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Deque, Dict, Optional
 from urllib.parse import urlparse, urlencode, parse_qs, urlunparse
+from uuid import uuid4
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.pool import NullPool
 
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+# ============== TLS and Connect Telemetry ==============
+
+# Phase timestamps of the connection attempt running in this context
+_connect_trace: ContextVar[Optional[Dict[str, Any]]] = ContextVar("_connect_trace", default=None)
+# Last TLS session per server hostname, offered for resumption on reconnect
+_tls_sessions: Dict[str, ssl.SSLSession] = {}
+# Phase timings (ms) of recent connections, newest last
+connect_timings: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+
+class _ResumingSSLObject(ssl.SSLObject):
+    """
+    SSLObject that offers the last session to the same host for resumption
+    and timestamps its handshake for connect telemetry.
+    
+    asyncio (and so asyncpg) never passes a session to wrap_bio, so this is
+    the only place resumption can be hooked in. TLS 1.3 tickets arrive
+    after the handshake, hence the session is saved from read() as well.
+    """
+    
+    @classmethod
+    def _create(cls, incoming, outgoing, server_side=False, server_hostname=None, session=None, context=None):
+        if session is None and server_hostname:
+            session = _tls_sessions.get(server_hostname)
+        sslobj = super()._create(
+            incoming, outgoing, server_side=server_side,
+            server_hostname=server_hostname, session=session, context=context,
+        )
+        sslobj._session_saved = False
+        return sslobj
+    
+    def do_handshake(self) -> None:
+        trace = _connect_trace.get()
+        if trace is not None:
+            trace.setdefault("tls_start", time.perf_counter())
+        super().do_handshake()  # Raises SSLWantReadError until complete
+        if trace is not None:
+            trace["tls_end"] = time.perf_counter()
+            trace["tls_resumed"] = self.session_reused
+        self._save_session()
+    
+    def read(self, *args, **kwargs):
+        data = super().read(*args, **kwargs)
+        if not self._session_saved:
+            self._save_session()
+        return data
+    
+    def _save_session(self) -> None:
+        session = self.session
+        if session is not None and self.server_hostname:
+            _tls_sessions[self.server_hostname] = session
+            # Keep looking until a resumable (ticketed) session shows up
+            self._session_saved = session.has_ticket
+
+
+@lru_cache(maxsize=None)
+def ssl_context() -> ssl.SSLContext:
+    """
+    Client TLS context, built once per process: loading the system CA
+    bundle is the expensive part of create_default_context().
+    """
+    context = ssl.create_default_context()
+    context.sslobject_class = _ResumingSSLObject
+    return context
+
+
+async def _timed_connect(*args, **kwargs):
+    """
+    asyncpg.connect, recording how long each phase took: DNS (only with
+    DB_CONNECT_TELEMETRY, which resolves the host once more up front), TCP
+    (including the SSLRequest round trip), TLS and auth/startup.
+    """
+    import asyncpg
+    
+    trace: Dict[str, Any] = {"start": time.perf_counter()}
+    token = _connect_trace.set(trace)
+    try:
+        host, port = kwargs.get("host"), kwargs.get("port") or 5432
+        if settings.DB_CONNECT_TELEMETRY and isinstance(host, str) and not host.startswith("/"):
+            await asyncio.get_running_loop().getaddrinfo(host, port)
+            trace["dns_end"] = time.perf_counter()
+        connection = await asyncpg.connect(*args, **kwargs)
+    finally:
+        _connect_trace.reset(token)
+    end = time.perf_counter()
+    
+    def ms(since: float, until: float) -> float:
+        return round((until - since) * 1000, 1)
+    
+    tcp_start = trace.get("dns_end", trace["start"])
+    tls_start = trace.get("tls_start", end)
+    tls_end = trace.get("tls_end", tls_start)
+    timing = {
+        "host": host,
+        "dns_ms": ms(trace["start"], trace["dns_end"]) if "dns_end" in trace else None,
+        "tcp_ms": ms(tcp_start, tls_start),
+        "tls_ms": ms(tls_start, tls_end),
+        "auth_ms": ms(tls_end, end),
+        "total_ms": ms(trace["start"], end),
+        "tls_resumed": trace.get("tls_resumed", False),
+    }
+    connect_timings.append(timing)
+    logger.info(
+        f"DB connect {host}: dns={timing['dns_ms']} tcp={timing['tcp_ms']} tls={timing['tls_ms']} "
+        f"auth={timing['auth_ms']} total={timing['total_ms']} ms resumed={timing['tls_resumed']}"
+    )
+    return connection
+
+
 def clean_database_url(url: str) -> tuple[str, dict]:
     """Clean database URL and extract SSL/connect args for asyncpg."""
     # Parse URL
@@ -21,7 +143,11 @@ def clean_database_url(url: str) -> tuple[str, dict]:
     
     if is_neon or 'sslmode' in query_params:
         # For Neon, we need SSL
-        connect_args['ssl'] = ssl.create_default_context()
+        connect_args['ssl'] = ssl_context()
+        if settings.DB_DIRECT_TLS:
+            # Start TLS right away instead of after an SSLRequest round trip
+            # (PostgreSQL 17+ servers)
+            connect_args['direct_tls'] = True
         # Remove sslmode and channel_binding from URL
         query_params.pop('sslmode', None)
         query_params.pop('channel_binding', None)
@@ -46,17 +172,86 @@ def clean_database_url(url: str) -> tuple[str, dict]:
     
     return cleaned_url, connect_args
 
+def resolve_pool_mode() -> str:
+    """The effective DB_POOL_MODE (auto resolved)."""
+    mode = settings.DB_POOL_MODE
+    if mode == "auto":
+        if settings.APP_ENV == "testing":
+            return "null"
+        return "serverless" if settings.VERCEL else "queue"
+    if mode not in ("queue", "serverless", "null"):
+        raise ValueError(f"Unknown DB_POOL_MODE: {mode}")
+    return mode
+
+
+def uses_pgbouncer(url: str) -> bool:
+    """Whether connections go through PgBouncer (DB_PGBOUNCER, else a Neon pooler host)."""
+    if settings.DB_PGBOUNCER is not None:
+        return settings.DB_PGBOUNCER
+    hostname = urlparse(url).hostname or ""
+    return "-pooler" in hostname
+
+
+def _prepared_statement_name() -> str:
+    # Unique per statement, so names never collide on a server connection
+    # PgBouncer hands to different clients
+    return f"__asyncpg_{uuid4().hex}__"
+
+
+def engine_options(url: str, base_connect_args: dict, pool_mode: Optional[str] = None) -> dict:
+    """
+    Keyword arguments for create_async_engine for a pool mode (default:
+    settings).
+    
+    - queue: a regular pool of DB_POOL_SIZE (+ DB_MAX_OVERFLOW) connections
+      for a long-running server.
+    - serverless: a single connection stays open between invocations of a
+      warm function instance, so only cold starts pay for DNS, TCP, TLS and
+      auth. With CACHE_BACKEND=postgres two are kept: the cache backend
+      checks out its own connection while the request's session holds the
+      first, and an overflow connection (closed when returned) would cost a
+      full handshake per cache operation.
+    - null: no pooling, a new connection per checkout.
+    
+    Behind PgBouncer in transaction mode each statement may run on a
+    different server connection, so asyncpg's and SQLAlchemy's prepared
+    statement caches are disabled and statements get unique names.
+    """
+    pool_mode = pool_mode or resolve_pool_mode()
+    connect_args = dict(base_connect_args)
+    connect_args["async_creator_fn"] = _timed_connect
+    if uses_pgbouncer(url):
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = _prepared_statement_name
+    
+    options = {
+        "echo": settings.DEBUG,  # Log SQL queries in debug mode
+        "future": True,
+        "connect_args": connect_args,
+    }
+    if pool_mode == "null":
+        options["poolclass"] = NullPool
+        return options
+    
+    options.update(
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    if pool_mode == "serverless":
+        pool_size = 2 if settings.CACHE_BACKEND == "postgres" else 1
+        options.update(pool_size=pool_size, max_overflow=settings.DB_MAX_OVERFLOW)
+    else:
+        options.update(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+    return options
+
+
 # Clean the database URL and get connect args
 clean_url, connect_args = clean_database_url(settings.ASYNC_DATABASE_URL)
 
 # Create async engine
-engine = create_async_engine(
-    clean_url,
-    echo=settings.DEBUG,  # Log SQL queries in debug mode
-    future=True,
-    poolclass=NullPool if settings.APP_ENV == "testing" else None,
-    connect_args=connect_args,
-)
+engine = create_async_engine(clean_url, **engine_options(clean_url, connect_args))
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -84,3 +279,17 @@ async def init_db():
     """Initialize database - create all tables."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+# Alembic revision the models correspond to. Bump it with every migration;
+# scripts/bench_startup.py warns when it is behind alembic/versions.
+SCHEMA_REVISION = "c4f7a2e9b615"
+
+
+async def get_schema_revision() -> Optional[str]:
+    """The database's Alembic revision, in one query (None if never migrated)."""
+    async with engine.connect() as conn:
+        try:
+            return await conn.scalar(text("SELECT version_num FROM alembic_version"))
+        except ProgrammingError:
+            return None
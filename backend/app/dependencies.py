@@ -40,9 +40,65 @@ async def get_current_user_id(user_id: str = Depends(get_clerk_user_id)) -> UUID
         return uuid5(NAMESPACE_URL, user_id)
 
 
+from datetime import datetime
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import make_transient_to_detached
+from app.cache import get_cache
 from app.models import User
 
+# User rows are never deleted in normal operation, so once a user is known
+# it is served from memory. The TTL only bounds how stale name/email can get.
+# Always process-local: a shared backend would put a round trip back on
+# every authenticated request.
+_known_users = get_cache("known_users", ttl=3600, local=True)
+
+
+async def ensure_user(db: AsyncSession, user_id: UUID, email: str, name: str) -> User:
+    """
+    Return the user row attached to `db`, creating it if it doesn't exist.
+    
+    Known users cost no database round trip. Unknown ones are provisioned
+    with INSERT ... ON CONFLICT DO NOTHING RETURNING, so concurrent first
+    requests for the same user can't fail on a duplicate key.
+    """
+    cached = await _known_users.get(str(user_id))
+    if cached is not None:
+        return await db.merge(cached, load=False)
+    
+    result = await db.scalars(
+        pg_insert(User)
+        .values(id=user_id, email=email, name=name, created_at=datetime.utcnow())
+        .on_conflict_do_nothing()
+        .returning(User)
+    )
+    user = result.one_or_none()
+    if user is not None:
+        await db.commit()
+    else:
+        # Already existed (or lost the race to another request)
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        if not user:
+            raise HTTPException(status_code=500, detail="Could not create user record")
+    
+    # Cache a detached copy; each session merges it back without a SELECT
+    snapshot = User(id=user.id, email=user.email, name=user.name, created_at=user.created_at)
+    make_transient_to_detached(snapshot)
+    await _known_users.set(str(user_id), snapshot)
+    return user
+
+
+async def ensure_demo_user(db: AsyncSession) -> User:
+    """The hardcoded demo user, provisioned on first use rather than at startup."""
+    return await ensure_user(
+        db,
+        UUID(settings.CURRENT_USER_ID),
+        email=settings.CURRENT_USER_EMAIL,
+        name="Usuario Demo",
+    )
+
+
 async def get_current_user(
     user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
@@ -50,30 +106,12 @@ async def get_current_user(
     """
     Get current user info, creating the user if they don't exist.
     """
-    # Check if user exists
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        # Create new user
-        # Note: In a real app, you might want to fetch email/name from Clerk API here
-        # or pass it via the token claims if custom claims are set up.
-        # For now, we create the user with just the ID. Profile info update can happen later.
-        user = User(
-            id=user_id,
-            email=f"user_{str(user_id)[:8]}@placeholder.com", # Placeholder until profile sync
-            name="New User"
-        )
-        db.add(user)
-        try:
-            await db.commit()
-            await db.refresh(user)
-        except Exception as e:
-            await db.rollback()
-            # Handle race condition if user created in parallel
-            result = await db.execute(select(User).where(User.id == user_id))
-            user = result.scalar_one_or_none()
-            if not user:
-                raise HTTPException(status_code=500, detail="Could not create user record")
-
-    return user
+    # Note: In a real app, you might want to fetch email/name from Clerk API here
+    # or pass it via the token claims if custom claims are set up.
+    # For now, we create the user with just the ID. Profile info update can happen later.
+    return await ensure_user(
+        db,
+        user_id,
+        email=f"user_{str(user_id)[:8]}@placeholder.com",  # Placeholder until profile sync
+        name="New User",
+    )
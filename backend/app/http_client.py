@@ -0,0 +1,97 @@
+"""
+Shared outbound HTTP client (Telegram Bot API, Clerk JWKS).
+
+One httpx.AsyncClient lives for the whole process, so calls to the same
+host reuse keep-alive (and, when the h2 package is installed, HTTP/2)
+connections instead of paying a TCP + TLS handshake each time. It is
+created on first use, so importing this module stays cheap, and closed by
+the app's lifespan on shutdown.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import random
+from typing import TYPE_CHECKING, Any, Optional
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """The process-wide client, created on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client, if it was ever created."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _retry_after(response: "httpx.Response") -> Optional[float]:
+    """
+    Seconds the server asked us to wait: Telegram's
+    parameters.retry_after, else the Retry-After header.
+    """
+    try:
+        retry_after = response.json().get("parameters", {}).get("retry_after")
+        if retry_after is not None:
+            return float(retry_after)
+    except (ValueError, AttributeError):
+        pass
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def request(method: str, url: str, max_retries: Optional[int] = None, **kwargs: Any) -> "httpx.Response":
+    """
+    Send a request with the shared client.
+
+    429 responses are retried up to max_retries times (default:
+    HTTP_MAX_RETRIES), waiting for the server's retry_after when given and
+    with jittered exponential backoff otherwise. If the server asks for
+    longer than HTTP_MAX_RETRY_DELAY the 429 is returned rather than
+    holding the request (and a serverless invocation) open.
+    """
+    client = get_http_client()
+    retries = settings.HTTP_MAX_RETRIES if max_retries is None else max_retries
+    attempt = 0
+    while True:
+        response = await client.request(method, url, **kwargs)
+        if response.status_code != 429 or attempt >= retries:
+            return response
+
+        delay = _retry_after(response)
+        if delay is None:
+            delay = settings.HTTP_RETRY_BACKOFF * (2 ** attempt) * (1 + random.random())
+        if delay > settings.HTTP_MAX_RETRY_DELAY:
+            logger.warning(f"{method} {response.url.host}: rate limited for {delay:.0f}s, not retrying")
+            return response
+
+        attempt += 1
+        logger.info(f"{method} {response.url.host}: rate limited, retry {attempt}/{retries} in {delay:.2f}s")
+        await asyncio.sleep(delay)
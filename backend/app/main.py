@@ -4,38 +4,55 @@ FastAPI application entry point
 """
 
 from contextlib import asynccontextmanager
+import importlib
 import sys
+from typing import Dict
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from app.auth import verified_tokens, verify_cron_secret
 from app.config import settings
-from app.database import init_db
-
-
-async def ensure_demo_user():
-    """Ensure that the hardcoded demo user exists in the database."""
-    from app.database import AsyncSessionLocal
-    from app.models import User
-    from sqlalchemy import select
-    import uuid
-
-    async with AsyncSessionLocal() as db:
-        user_id = uuid.UUID(settings.CURRENT_USER_ID)
-        try:
-            result = await db.execute(select(User).where(User.id == user_id))
-            if not result.scalar_one_or_none():
-                print(f"Creating demo user: {settings.CURRENT_USER_EMAIL}")
-                user = User(
-                    id=user_id,
-                    email=settings.CURRENT_USER_EMAIL,
-                    name="Usuario Demo"
-                )
-                db.add(user)
-                await db.commit()
-        except Exception as e:
-            print(f"Could not ensure demo user: {e}")
+
+
+def resolve_startup_mode() -> str:
+    """The effective STARTUP_MODE (auto resolved)."""
+    mode = settings.STARTUP_MODE
+    if mode == "auto":
+        return "create_all" if settings.APP_ENV == "development" else "check"
+    if mode not in ("create_all", "check", "trust"):
+        raise ValueError(f"Unknown STARTUP_MODE: {mode}")
+    return mode
+
+
+async def prepare_database(mode: str) -> None:
+    """
+    Startup work on the database for a STARTUP_MODE.
+    
+    Production schemas are managed by Alembic, so on a (serverless) cold
+    start "check" only compares the Alembic revision in one query, which
+    also leaves a warm pooled connection behind; "trust" skips even that.
+    "create_all" reflects every table and creates missing ones (local
+    development). The demo user is provisioned on first use, not here.
+    """
+    if mode == "trust":
+        return
+    # Imported here so "trust" cold starts don't load SQLAlchemy up front
+    from app.database import SCHEMA_REVISION, get_schema_revision, init_db
+    
+    if mode == "create_all":
+        print("Initializing database...")
+        await init_db()
+        print("Database initialized")
+    elif mode == "check":
+        revision = await get_schema_revision()
+        if revision != SCHEMA_REVISION:
+            print(
+                f"WARNING: database schema is at revision {revision}, this build "
+                f"expects {SCHEMA_REVISION}. Run: alembic upgrade head"
+            )
 
 
 @asynccontextmanager
@@ -44,14 +61,8 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Starting up Banquito API...")
     
-    # Initialize database tables
     try:
-        print("Initializing database...")
-        await init_db()
-        print("Database initialized")
-        
-        # Ensure demo user exists
-        await ensure_demo_user()
+        await prepare_database(resolve_startup_mode())
     except Exception as e:
         print(f"Database initialization warning: {e}")
         # Continue even if DB init fails - tables might already exist
@@ -60,6 +71,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("Shutting down Banquito API...")
+    from app.http_client import close_http_client
+    
+    await close_http_client()
 
 
 # Create FastAPI application
@@ -111,10 +125,46 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
-# Import and include routers FIRST (before catch-all routes)
-from app.routers import telegram
+class LazyRouters:
+    """
+    ASGI middleware that imports and includes each router on the first
+    request under its prefix.
+    
+    A serverless cold start then only imports the routers (and their
+    services, schemas and clients) the request actually needs. Requests
+    for the OpenAPI schema or docs load every router first.
+    """
+    
+    def __init__(self, app: ASGIApp, target: FastAPI, routers: Dict[str, str]):
+        self.app = app
+        self.target = target
+        self.pending = dict(routers)
+    
+    def load(self, prefix: str) -> None:
+        module = importlib.import_module(self.pending[prefix])
+        self.target.include_router(module.router, prefix=prefix)
+        # Only once included: a failed import is retried on the next request
+        del self.pending[prefix]
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.pending and scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            docs = path in (self.target.openapi_url, self.target.docs_url, self.target.redoc_url)
+            for prefix in list(self.pending):
+                if docs or path == prefix or path.startswith(prefix + "/"):
+                    self.load(prefix)
+        await self.app(scope, receive, send)
+
+
+# Routers by prefix, included on first use (see LazyRouters)
+ROUTERS = {
+    "/api/telegram": "app.routers.telegram",
+    "/api/jobs": "app.routers.jobs",
+    "/api/installments": "app.routers.installments",
+    "/api/summaries": "app.routers.summaries",
+}
 
-app.include_router(telegram.router, prefix="/api/telegram")
+app.add_middleware(LazyRouters, target=app, routers=ROUTERS)
 
 
 # Basic API routes
@@ -134,6 +184,12 @@ async def health_check():
     return {"status": "healthy", "version": settings.VERSION}
 
 
+@app.get("/api/health/auth", dependencies=[Depends(verify_cron_secret)])
+async def auth_health_check():
+    """Verified-token cache counters, for monitoring (operational, like /api/jobs)."""
+    return {"token_cache": verified_tokens.stats()}
+
+
 # Static file serving is handled by Vercel's static build output
 # No need to serve frontend from Python
 
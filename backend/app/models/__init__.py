@@ -6,18 +6,20 @@ from decimal import Decimal
 from enum import Enum as PyEnum
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
     ForeignKey,
     Integer,
+    LargeBinary,
     Numeric,
     String,
     Text,
     UniqueConstraint,
     Index,
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -90,6 +92,20 @@ class ServiceBenefitType(str, PyEnum):
     CASHBACK = "CASHBACK"
 
 
+class JobStatus(str, PyEnum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+class LedgerReason(str, PyEnum):
+    OPENING = "OPENING"  # Balance before the ledger existed
+    TRANSACTION = "TRANSACTION"
+    ADJUSTMENT = "ADJUSTMENT"  # Amount or date of an existing transaction changed
+    REVERSAL = "REVERSAL"  # Transaction deleted
+
+
 # Models
 class User(Base):
     """User model."""
@@ -233,7 +249,7 @@ class Transaction(Base):
     # Installment fields
     installment_number = Column(Integer, nullable=True)
     installment_total = Column(Integer, nullable=True)
-    installment_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    installment_id = Column(UUID(as_uuid=True), nullable=True)
     
     # Relations
     category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True)
@@ -245,10 +261,37 @@ class Transaction(Base):
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Indexes
+    # Indexes, one per query shape (see scripts/explain_indexes.py). The
+    # INCLUDE columns let the summary aggregates run as index-only scans.
     __table_args__ = (
-        Index("ix_transactions_user_date", "user_id", "date"),
+        # Listing, keyset pagination and date-range summaries per user
+        Index(
+            "ix_transactions_user_date_id", "user_id", "date", "id",
+            postgresql_include=["transaction_type", "amount"],
+        ),
+        Index("ix_transactions_user_type_date", "user_id", "transaction_type", "date", "id"),
+        # Per-product listings, summaries and statement cycles
+        Index(
+            "ix_transactions_from_product_date", "from_product_id", "date", "id",
+            postgresql_where=from_product_id.isnot(None),
+            postgresql_include=["transaction_type", "amount"],
+        ),
+        Index(
+            "ix_transactions_to_product_date", "to_product_id", "date",
+            postgresql_where=to_product_id.isnot(None),
+            postgresql_include=["transaction_type", "amount"],
+        ),
+        Index(
+            "ix_transactions_category_date", "category_id", "date", "id",
+            postgresql_where=category_id.isnot(None),
+        ),
+        # Installment groups and outstanding plans
         Index("ix_transactions_installment", "installment_id"),
+        Index(
+            "ix_transactions_user_installments", "user_id", "installment_id",
+            postgresql_where=installment_id.isnot(None),
+            postgresql_include=["from_product_id", "installment_total", "installment_number", "amount", "date"],
+        ),
     )
 
     # Relationships
@@ -263,6 +306,81 @@ class Transaction(Base):
         return f"<Transaction {self.description} ${self.amount}>"
 
 
+class BalanceLedgerEntry(Base):
+    """
+    Append-only record of every change to a product's balance.
+    
+    The balance of a product at any date is the sum of its entries with
+    effective_at up to that date; BalanceSnapshot keeps that sum short.
+    """
+    __tablename__ = "balance_ledger"
+
+    # Sequential id: snapshots record the last entry they cover
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("financial_products.id", ondelete="CASCADE"), nullable=False)
+    amount = Column(Numeric(15, 2), nullable=False)  # Signed balance change
+    effective_at = Column(DateTime(timezone=True), nullable=False)
+    reason = Column(String(20), nullable=False)  # LedgerReason
+    # Not a FK: entries outlive the transactions they record
+    transaction_id = Column(UUID(as_uuid=True), nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+    # Indexes
+    __table_args__ = (
+        Index("ix_balance_ledger_product_effective", "product_id", "effective_at"),
+    )
+
+    def __repr__(self):
+        return f"<BalanceLedgerEntry {self.product_id} {self.amount}>"
+
+
+class BalanceSnapshot(Base):
+    """Balance of a product at as_of, covering ledger entries up to last_entry_id."""
+    __tablename__ = "balance_snapshots"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("financial_products.id", ondelete="CASCADE"), nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    balance = Column(Numeric(15, 2), nullable=False)
+    last_entry_id = Column(BigInteger, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+    # Unique constraint
+    __table_args__ = (
+        UniqueConstraint("product_id", "as_of", name="uq_balance_snapshot_product_as_of"),
+    )
+
+    def __repr__(self):
+        return f"<BalanceSnapshot {self.product_id} {self.as_of} {self.balance}>"
+
+
+class InstallmentBucket(Base):
+    """Installments a card has dated in one calendar month (maintained on writes)."""
+    __tablename__ = "installment_buckets"
+
+    product_id = Column(UUID(as_uuid=True), ForeignKey("financial_products.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    amount = Column(Numeric(15, 2), nullable=False, default=Decimal("0.00"))
+    transaction_count = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Projections read a user's upcoming months straight off this index
+    __table_args__ = (
+        Index(
+            "ix_installment_buckets_user_period", "user_id", "year", "month",
+            postgresql_include=["amount", "transaction_count"],
+        ),
+    )
+
+    def __repr__(self):
+        return f"<InstallmentBucket {self.product_id} {self.month}/{self.year} ${self.amount}>"
+
+
 class CreditCardSummary(Base):
     """Credit card monthly summary model."""
     __tablename__ = "credit_card_summaries"
@@ -278,6 +396,8 @@ class CreditCardSummary(Base):
     is_closed = Column(Boolean, default=False)
     status = Column(String(20), default=SummaryStatus.DRAFT.value)  # SummaryStatus
     paid_date = Column(DateTime(timezone=True), nullable=True)
+    # Set when a transaction in the cycle changes after the statement closed
+    needs_reconciliation = Column(Boolean, nullable=False, default=False, server_default="false")
     
     # Relations
     institution_id = Column(UUID(as_uuid=True), ForeignKey("financial_institutions.id"), nullable=True)
@@ -291,7 +411,8 @@ class CreditCardSummary(Base):
 
     # Unique constraint
     __table_args__ = (
-        UniqueConstraint("institution_id", "product_id", "year", "month", name="uq_summary_institution_product_year_month"),
+        # Not institution_id: it is nullable, and NULLs never conflict
+        UniqueConstraint("product_id", "year", "month", name="uq_summary_product_year_month"),
         Index("ix_summaries_user_product", "user_id", "product_id"),
     )
 
@@ -463,3 +584,52 @@ class ExchangeRate(Base):
 
     def __repr__(self):
         return f"<ExchangeRate {self.from_currency}->{self.to_currency} {self.rate}>"
+
+
+class Job(Base):
+    """Background job processed by the worker (app.worker)."""
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=True)  # JSON serialized
+    status = Column(String(20), default=JobStatus.PENDING.value, nullable=False)  # JobStatus
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    dedupe_key = Column(String(255), nullable=True, unique=True)
+    last_error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)  # JSON serialized
+    
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Indexes
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+    def __repr__(self):
+        return f"<Job {self.kind} {self.status}>"
+
+
+class CacheRecord(Base):
+    """Entry of the Postgres cache backend (app.cache.PostgresBackend)."""
+    __tablename__ = "cache_entries"
+
+    namespace = Column(String(255), primary_key=True)
+    key = Column(Text, primary_key=True)
+    value = Column(LargeBinary, nullable=False)  # Pickled
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    tags = Column(ARRAY(Text), nullable=False, default=list, server_default="{}")
+
+    # Unlogged: no WAL writes, contents are dropped after a crash
+    __table_args__ = (
+        Index("ix_cache_entries_expires_at", "expires_at"),
+        Index("ix_cache_entries_tags", "tags", postgresql_using="gin"),
+        {"prefixes": ["UNLOGGED"]},
+    )
+
+    def __repr__(self):
+        return f"<CacheRecord {self.namespace}:{self.key}>"
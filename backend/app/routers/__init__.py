@@ -1,7 +1,12 @@
-"""Routers module - API endpoints."""
+"""Routers module - API endpoints.
 
-from app.routers import telegram
+Submodules are not imported here: app.main includes each router on the
+first request under its prefix, so importing the package stays cheap.
+"""
 
 __all__ = [
+    "installments",
+    "jobs",
+    "summaries",
     "telegram",
 ]
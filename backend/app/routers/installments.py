@@ -0,0 +1,24 @@
+"""Installment plan endpoints."""
+
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.dependencies import get_current_user, get_db
+from app.models import User
+from app.schemas import InstallmentPlanResponse
+from app.services.transaction_service import TransactionService
+
+router = APIRouter(tags=["Installments"])
+
+
+@router.get("/outstanding", response_model=List[InstallmentPlanResponse])
+async def get_outstanding_installments(
+    product_id: Optional[UUID] = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Installment plans with installments still to come, optionally for one card."""
+    return await TransactionService(db).get_outstanding_installments(user.id, product_id=product_id)
@@ -0,0 +1,41 @@
+"""Background job endpoints (cron trigger and status)."""
+
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import verify_cron_secret
+from app.config import settings
+from app.database import get_db
+from app.services.job_service import JobService
+from app.worker import run_pending, schedule_periodic
+
+router = APIRouter(tags=["Jobs"])
+
+
+@router.api_route("/run", methods=["GET", "POST"], dependencies=[Depends(verify_cron_secret)])
+async def run_jobs(max_jobs: int = 10):
+    """Run queued jobs within the serverless time budget."""
+    await schedule_periodic()
+    processed = await run_pending(max_jobs=max_jobs, time_budget=settings.JOBS_TIME_BUDGET_SECONDS)
+    return {"processed": processed}
+
+
+@router.get("/{job_id}", dependencies=[Depends(verify_cron_secret)])
+async def get_job_status(job_id: UUID, db: AsyncSession = Depends(get_db)):
+    """Get the status of a job."""
+    job = await JobService(db).get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_after": job.run_after,
+        "last_error": job.last_error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
@@ -0,0 +1,25 @@
+"""Credit card summary endpoints."""
+
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.dependencies import get_current_user, get_db
+from app.models import User
+from app.schemas import SummaryProjectionResponse
+from app.services.projection_service import MAX_PROJECTION_MONTHS, ProjectionService
+
+router = APIRouter(tags=["Summaries"])
+
+
+@router.get("/projection", response_model=List[SummaryProjectionResponse])
+async def get_projection(
+    months: int = Query(6, ge=1, le=MAX_PROJECTION_MONTHS),
+    product_id: Optional[UUID] = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Installments committed for each of the coming months, optionally for one card."""
+    return await ProjectionService(db).get_projection(user.id, months=months, product_id=product_id)
@@ -1,18 +1,20 @@
-import csv
-import io
 import uuid
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
-import httpx
-from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, Request, HTTPException, Depends
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app import http_client
 from app.config import settings
 from app.database import get_db
+from app.dependencies import ensure_demo_user
 from app.models import Transaction, TransactionType, Category
+from app.services.import_service import CsvImportService, ImportResult
+from app.services.job_service import JobService
+from app.worker import run_pending
 
 router = APIRouter(tags=["Telegram"])
 
@@ -72,14 +74,43 @@ async def save_transaction(
 
 
 async def send_telegram_message(chat_id: int, text: str):
-    async with httpx.AsyncClient() as client:
-        await client.post(
-            f"{TELEGRAM_API_URL}/sendMessage",
-            json={"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}
+    await http_client.request(
+        "POST",
+        f"{TELEGRAM_API_URL}/sendMessage",
+        json={"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}
+    )
+
+
+async def import_csv_document(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    file_id: str,
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+    before_commit: Optional[Callable[[ImportResult], Awaitable[None]]] = None,
+) -> ImportResult:
+    """Download a CSV document from Telegram and import it while streaming."""
+    file_info = await http_client.request("GET", f"{TELEGRAM_API_URL}/getFile", params={"file_id": file_id})
+    file_path = file_info.json().get('result', {}).get('file_path')
+    
+    if not file_path:
+        raise ValueError("Telegram did not return a file path")
+    
+    # Stream the file: rows are parsed and inserted in chunks as they arrive
+    client = http_client.get_http_client()
+    async with client.stream("GET", f"{TELEGRAM_FILE_URL}/{file_path}") as file_response:
+        file_response.raise_for_status()
+        return await CsvImportService(db).import_lines(
+            user_id, file_response.aiter_lines(), on_progress, before_commit
         )
 
+
 @router.post("/webhook")
-async def telegram_webhook(update: TelegramUpdate, request: Request, db: AsyncSession = Depends(get_db)):
+async def telegram_webhook(
+    update: TelegramUpdate,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
     """Handle incoming Telegram updates."""
     if not update.message:
         return {"status": "ignored"}
@@ -90,7 +121,8 @@ async def telegram_webhook(update: TelegramUpdate, request: Request, db: AsyncSe
     if not chat_id:
         return {"status": "no_chat"}
 
-    user_id = uuid.UUID(settings.CURRENT_USER_ID)
+    # Demo user, created on first use (served from memory afterwards)
+    user_id = (await ensure_demo_user(db)).id
 
     # 1. Handle Document (CSV)
     if update.message.document:
@@ -99,50 +131,20 @@ async def telegram_webhook(update: TelegramUpdate, request: Request, db: AsyncSe
             await send_telegram_message(chat_id, "⚠️ Solo acepto archivos .csv por ahora.")
             return {"status": "invalid_format"}
             
-        await send_telegram_message(chat_id, "⏳ Procesando tu archivo CSV...")
-        
-        async with httpx.AsyncClient() as client:
-            file_info = await client.get(f"{TELEGRAM_API_URL}/getFile?file_id={doc.file_id}")
-            file_path = file_info.json().get('result', {}).get('file_path')
-            
-            if not file_path:
-                await send_telegram_message(chat_id, "❌ Error al obtener el archivo de Telegram.")
-                return {"status": "file_error"}
-                
-            file_response = await client.get(f"{TELEGRAM_FILE_URL}/{file_path}")
-            csv_text = file_response.text
-
-        # Parse CSV — expected columns: Fecha (YYYY-MM-DD), Monto, Descripción, [Categoría]
-        reader = csv.reader(io.StringIO(csv_text))
-        next(reader, None)  # skip header
-        
-        count = 0
-        errors = 0
-        for row in reader:
-            if len(row) >= 3:
-                try:
-                    date_str, amount_str, description = row[0].strip(), row[1].strip(), row[2].strip()
-                    date_obj = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-                    amount = float(amount_str.replace(",", "."))
-                    
-                    category_id = None
-                    if len(row) >= 4 and row[3].strip():
-                        category = await get_or_create_category(db, user_id, row[3].strip())
-                        category_id = category.id
-
-                    t_type = TransactionType.INCOME.value if amount > 0 else TransactionType.EXPENSE.value
-                    await save_transaction(db, user_id, amount, description, date_obj, category_id, t_type)
-                    count += 1
-                except Exception as e:
-                    print(f"Error parseando fila {row}: {e}")
-                    errors += 1
-                    continue
+        # Download and import happen in the job worker so Telegram gets its
+        # acknowledgement right away; the update_id dedupes redeliveries.
+        job_id = await JobService(db).enqueue(
+            "csv_import",
+            {"chat_id": chat_id, "file_id": doc.file_id, "user_id": str(user_id)},
+            dedupe_key=f"telegram:{update.update_id}",
+        )
+        if not job_id:
+            return {"status": "duplicate"}
         
-        msg = f"✅ CSV procesado: *{count}* transacciones guardadas."
-        if errors:
-            msg += f"\n⚠️ {errors} filas con errores."
-        await send_telegram_message(chat_id, msg)
-        return {"status": "csv_processed"}
+        await send_telegram_message(chat_id, "⏳ Recibí tu archivo CSV, lo estoy procesando...")
+        # Opportunistic kick; the cron endpoint / worker process pick it up otherwise
+        background_tasks.add_task(run_pending, max_jobs=1)
+        return {"status": "queued", "job_id": str(job_id)}
 
     # 2. Handle Text
     text = update.message.text
@@ -229,11 +231,11 @@ async def setup_webhook(request: Request):
         
     webhook_url = f"{base_url}/api/telegram/webhook"
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{TELEGRAM_API_URL}/setWebhook",
-            json={"url": webhook_url, "drop_pending_updates": True}
-        )
-        data = response.json()
+    response = await http_client.request(
+        "POST",
+        f"{TELEGRAM_API_URL}/setWebhook",
+        json={"url": webhook_url, "drop_pending_updates": True}
+    )
+    data = response.json()
         
     return {"webhook_url": webhook_url, "telegram_response": data}
@@ -315,6 +315,20 @@ class TransferCreate(BaseSchema):
     to_product_id: UUID
 
 
+class InstallmentPlanResponse(BaseSchema):
+    """An installment purchase with installments still to come."""
+    installment_id: UUID
+    product_id: Optional[UUID] = None
+    description: str
+    installment_total: int
+    installments_paid: int
+    installments_remaining: int
+    total_amount: Decimal
+    remaining_amount: Decimal
+    next_date: datetime
+    last_date: datetime
+
+
 # ============== Credit Card Summary Schemas ==============
 
 class SummaryItemBase(BaseSchema):
@@ -391,6 +405,7 @@ class CreditCardSummaryResponse(CreditCardSummaryBase, TimestampSchema):
     institution_id: Optional[UUID] = None
     user_id: UUID
     paid_from_product_id: Optional[UUID] = None
+    needs_reconciliation: bool = False
 
 
 class CreditCardSummaryDetailResponse(CreditCardSummaryResponse):
@@ -529,11 +544,19 @@ class ErrorResponse(BaseSchema):
 
 
 class PaginatedResponse(BaseSchema):
+    """
+    Page of results.
+
+    Offset pagination fills total/page/pages; cursor (keyset) pagination
+    leaves them empty and returns next_cursor instead, which is None on
+    the last page.
+    """
     items: List
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     page_size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 # ============== Dashboard/Stats Schemas ==============
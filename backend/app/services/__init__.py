@@ -1,7 +1,17 @@
 """Services module - Business logic layer."""
 
 from app.services.transaction_service import TransactionService
+from app.services.import_service import CsvImportService
+from app.services.job_service import JobService
+from app.services.ledger_service import LedgerService
+from app.services.projection_service import ProjectionService
+from app.services.statement_service import StatementService
 
 __all__ = [
     "TransactionService",
+    "CsvImportService",
+    "JobService",
+    "LedgerService",
+    "ProjectionService",
+    "StatementService",
 ]
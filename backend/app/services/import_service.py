@@ -0,0 +1,188 @@
+"""CSV import service - Bulk import of bank exports into transactions."""
+
+import csv
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import select, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import invalidate_tags
+from app.models import Category, CategoryType, Transaction, TransactionType
+
+logger = logging.getLogger(__name__)
+
+# Rows per multi-row INSERT; bounds memory while keeping round trips low
+CHUNK_SIZE = 500
+
+# Transaction.amount is Numeric(15, 2)
+_MAX_AMOUNT = Decimal(10) ** 13
+# Longer values would fail the INSERT for the whole chunk
+_MAX_DESCRIPTION = Transaction.__table__.c.description.type.length
+_MAX_CATEGORY = Category.__table__.c.name.type.length
+
+
+@dataclass
+class ImportResult:
+    """Outcome of a CSV import."""
+    imported: int = 0
+    errors: int = 0
+
+
+class CsvImportService:
+    """
+    Streaming CSV importer.
+
+    Expected columns: Fecha (YYYY-MM-DD), Monto, Descripción, [Categoría].
+    Positive amounts are income, negative amounts are expenses.
+
+    Lines are parsed as they arrive and written in chunks of CHUNK_SIZE
+    rows: category names are resolved for the whole chunk with one query
+    (missing ones are created with one insert) and transactions go out as
+    one multi-row INSERT. Everything runs inside a single database
+    transaction that is committed at the end.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._category_ids: Dict[str, UUID] = {}
+
+    async def import_lines(
+        self,
+        user_id: UUID,
+        lines: AsyncIterator[str],
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+        before_commit: Optional[Callable[[ImportResult], Awaitable[None]]] = None,
+    ) -> ImportResult:
+        """
+        Import CSV lines (header first). Calls on_progress after each chunk,
+        and before_commit with the result inside the import's transaction
+        (e.g. to record that the import happened, atomically with it).
+        """
+        result = ImportResult()
+        pending: List[str] = []
+        in_quotes = False
+        header_skipped = False
+
+        async for line in lines:
+            if not header_skipped:
+                header_skipped = True
+                continue
+
+            pending.append(line + "\n")
+            # Only cut chunks on a record boundary (no open quoted field)
+            in_quotes ^= line.count('"') % 2 == 1
+            if len(pending) >= CHUNK_SIZE and not in_quotes:
+                await self._import_chunk(user_id, pending, result)
+                pending = []
+                if on_progress:
+                    await on_progress(result.imported)
+
+        if pending:
+            await self._import_chunk(user_id, pending, result)
+
+        if before_commit:
+            await before_commit(result)
+        await self.db.commit()
+        try:
+            await invalidate_tags([f"user:{user_id}"])
+        except Exception as e:
+            logger.error(f"Cache invalidation failed after import: {e}")
+        return result
+
+    async def _import_chunk(self, user_id: UUID, lines: List[str], result: ImportResult) -> None:
+        """Parse and insert one chunk of CSV lines."""
+        parsed = []
+        for row in csv.reader(lines):
+            if not row:
+                continue
+            try:
+                parsed.append(self._parse_row(row))
+            except (ValueError, InvalidOperation) as e:
+                logger.warning(f"Error parseando fila {row}: {e}")
+                result.errors += 1
+
+        if not parsed:
+            return
+
+        await self._resolve_categories(
+            user_id, {category for *_, category in parsed if category}
+        )
+
+        rows = [
+            {
+                "id": uuid4(),
+                "amount": abs(amount),
+                "date": date,
+                "description": description,
+                "transaction_type": (
+                    TransactionType.INCOME.value if amount > 0 else TransactionType.EXPENSE.value
+                ),
+                "status": "COMPLETED",
+                "user_id": user_id,
+                "category_id": self._category_ids.get(category.lower()) if category else None,
+            }
+            for date, amount, description, category in parsed
+        ]
+        await self.db.execute(insert(Transaction), rows)
+        result.imported += len(rows)
+
+    @staticmethod
+    def _parse_row(row: List[str]) -> tuple:
+        """Parse a CSV row into (date, amount, description, category)."""
+        if len(row) < 3:
+            raise ValueError("expected at least 3 columns")
+
+        date_str, amount_str, description = row[0].strip(), row[1].strip(), row[2].strip()
+        date = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        amount = Decimal(amount_str.replace(",", "."))
+        # Decimal() accepts NaN/Infinity; NaN breaks comparisons and both
+        # would fail the INSERT for the whole chunk
+        if not amount.is_finite():
+            raise ValueError(f"invalid amount '{amount_str}'")
+        if abs(amount) >= _MAX_AMOUNT:
+            raise ValueError(f"amount out of range '{amount_str}'")
+        category = row[3].strip() if len(row) >= 4 else ""
+        if len(description) > _MAX_DESCRIPTION:
+            raise ValueError(f"description longer than {_MAX_DESCRIPTION} characters")
+        if len(category) > _MAX_CATEGORY:
+            raise ValueError(f"category longer than {_MAX_CATEGORY} characters")
+        if "\x00" in description or "\x00" in category:
+            raise ValueError("text contains NUL characters")  # Postgres rejects them
+        return date, amount, description, category
+
+    async def _resolve_categories(self, user_id: UUID, names: set) -> None:
+        """Map category names to ids, creating the missing ones in one insert."""
+        missing = {name.lower(): name for name in names if name.lower() not in self._category_ids}
+        if not missing:
+            return
+
+        result = await self.db.execute(
+            select(Category.id, func.lower(Category.name))
+            .where(
+                Category.user_id == user_id,
+                func.lower(Category.name).in_(missing),
+            )
+        )
+        for category_id, lowered in result:
+            self._category_ids.setdefault(lowered, category_id)
+            missing.pop(lowered, None)
+
+        if missing:
+            new_rows = [
+                {
+                    "id": uuid4(),
+                    "name": name,
+                    "user_id": user_id,
+                    "category_type": CategoryType.EXPENSE.value,
+                    "is_system": False,
+                }
+                for name in missing.values()
+            ]
+            await self.db.execute(insert(Category), new_rows)
+            for row in new_rows:
+                self._category_ids[row["name"].lower()] = row["id"]
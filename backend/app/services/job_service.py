@@ -0,0 +1,209 @@
+"""Job service - Postgres-backed queue for background work."""
+
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Job, JobStatus
+
+
+# Seconds before a RUNNING job whose worker died can be claimed again.
+# Long jobs keep their lock with heartbeat()
+JOB_LOCK_TIMEOUT = 300
+# Base delay for retries; doubles with every attempt
+JOB_RETRY_BASE_DELAY = 15
+
+
+class JobLockLost(Exception):
+    """The running attempt no longer owns its job (it was reclaimed)."""
+
+
+class JobService:
+    """
+    Enqueue, claim and settle background jobs.
+
+    Claiming uses SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+    workers (a local process, cron-triggered invocations) can pull from the
+    same table without handing the same job to two of them.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        dedupe_key: Optional[str] = None,
+        max_attempts: int = 3
+    ) -> Optional[UUID]:
+        """
+        Queue a job and commit.
+
+        Returns the job id, or None when a job with the same dedupe_key
+        already exists (e.g. Telegram redelivering the same update).
+        """
+        result = await self.db.execute(
+            pg_insert(Job)
+            .values(
+                kind=kind,
+                payload=json.dumps(payload, default=str),
+                status=JobStatus.PENDING.value,
+                attempts=0,
+                max_attempts=max_attempts,
+                run_after=datetime.utcnow(),
+                dedupe_key=dedupe_key,
+            )
+            .on_conflict_do_nothing(index_elements=[Job.dedupe_key])
+            .returning(Job.id)
+        )
+        job_id = result.scalar_one_or_none()
+        await self.db.commit()
+        return job_id
+
+    async def get_job(self, job_id: UUID) -> Optional[Job]:
+        """Get a job by id."""
+        result = await self.db.execute(select(Job).where(Job.id == job_id))
+        return result.scalar_one_or_none()
+
+    async def claim(self, limit: int = 1) -> List[Job]:
+        """
+        Atomically mark up to `limit` runnable jobs as RUNNING and return them.
+
+        RUNNING jobs whose lock expired (their worker died) are claimed
+        again, unless that was their last attempt: those are marked FAILED.
+        """
+        now = datetime.utcnow()
+        expired = and_(
+            Job.status == JobStatus.RUNNING.value,
+            Job.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT),
+        )
+        await self.db.execute(
+            update(Job)
+            .where(and_(expired, Job.attempts >= Job.max_attempts))
+            .values(
+                status=JobStatus.FAILED.value,
+                locked_at=None,
+                last_error="Lock expired on the last attempt",
+            )
+            .execution_options(synchronize_session=False)
+        )
+        runnable = (
+            select(Job.id)
+            .where(
+                or_(
+                    and_(Job.status == JobStatus.PENDING.value, Job.run_after <= now),
+                    and_(expired, Job.attempts < Job.max_attempts),
+                )
+            )
+            .order_by(Job.run_after)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            update(Job)
+            .where(Job.id.in_(runnable))
+            .values(
+                status=JobStatus.RUNNING.value,
+                locked_at=now,
+                attempts=Job.attempts + 1,
+            )
+            .returning(Job)
+            .execution_options(synchronize_session=False)
+        )
+        jobs = list(result.scalars().all())
+        await self.db.commit()
+        return jobs
+
+    async def heartbeat(self, job: Job) -> bool:
+        """
+        Renew a running job's lock so it isn't reclaimed as abandoned.
+        Returns False if the job is no longer this attempt's to run.
+        """
+        result = await self.db.execute(
+            update(Job)
+            .where(
+                and_(
+                    Job.id == job.id,
+                    Job.status == JobStatus.RUNNING.value,
+                    Job.attempts == job.attempts,
+                )
+            )
+            .values(locked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount > 0
+
+    async def complete_with(self, job: Job, result: Any = None) -> None:
+        """
+        Mark a job as done inside the caller's open transaction, so the
+        job's own writes and its completion commit (or roll back) together.
+        Raises JobLockLost if this attempt no longer owns the job.
+        """
+        updated = await self.db.execute(
+            update(Job)
+            .where(
+                and_(
+                    Job.id == job.id,
+                    Job.status == JobStatus.RUNNING.value,
+                    Job.attempts == job.attempts,
+                )
+            )
+            .values(
+                status=JobStatus.DONE.value,
+                locked_at=None,
+                result=json.dumps(result, default=str) if result is not None else None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if updated.rowcount == 0:
+            raise JobLockLost(f"Job {job.id} was reclaimed by another worker")
+
+    async def complete(self, job: Job, result: Any = None) -> None:
+        """Mark a job as done."""
+        await self._settle(
+            job.id,
+            status=JobStatus.DONE.value,
+            locked_at=None,
+            result=json.dumps(result, default=str) if result is not None else None,
+        )
+
+    async def fail(self, job: Job, error: str) -> bool:
+        """
+        Record a failed attempt. The job is retried with exponential
+        backoff until max_attempts is reached; returns True if it will retry.
+        """
+        will_retry = job.attempts < job.max_attempts
+        if will_retry:
+            delay = JOB_RETRY_BASE_DELAY * 2 ** (job.attempts - 1)
+            await self._settle(
+                job.id,
+                status=JobStatus.PENDING.value,
+                locked_at=None,
+                run_after=datetime.utcnow() + timedelta(seconds=delay),
+                last_error=error,
+            )
+        else:
+            await self._settle(
+                job.id,
+                status=JobStatus.FAILED.value,
+                locked_at=None,
+                last_error=error,
+            )
+        return will_retry
+
+    async def _settle(self, job_id: UUID, **values: Any) -> None:
+        await self.db.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
@@ -0,0 +1,239 @@
+"""Ledger service - Append-only balance history and snapshots."""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, time, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import select, insert, delete, and_, or_, cast, func
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import BigInteger, DateTime
+
+from app.models import BalanceLedgerEntry, BalanceSnapshot, FinancialProduct, LedgerReason
+
+logger = logging.getLogger(__name__)
+
+# Lower bound used for products that have no snapshot yet
+_NO_SNAPSHOT = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Upper bound for "current" balances (includes future-dated entries)
+_END_OF_TIME = datetime(9999, 12, 31, tzinfo=timezone.utc)
+
+
+@dataclass
+class BalanceChange:
+    """A signed change to one product's balance."""
+    product_id: UUID
+    amount: Decimal
+    effective_at: datetime
+    transaction_id: Optional[UUID] = None
+
+
+class LedgerService:
+    """
+    Append-only balance ledger with periodic snapshots.
+
+    Every balance mutation is recorded as an entry in the same database
+    transaction that applies it. A product's balance at a date is its
+    latest snapshot at or before that date plus the entries after it, so
+    historical queries read a handful of rows instead of the whole history.
+
+    Snapshots remember the last entry id they cover; entries recorded
+    later with an earlier effective date (backdated transactions, CSV
+    imports) are still picked up as part of the delta.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def record(
+        self,
+        changes: Iterable[BalanceChange],
+        reason: LedgerReason = LedgerReason.TRANSACTION
+    ) -> None:
+        """Append entries for balance changes. Does not commit."""
+        rows = [
+            {
+                "product_id": change.product_id,
+                "amount": change.amount,
+                "effective_at": change.effective_at,
+                "reason": reason.value,
+                "transaction_id": change.transaction_id,
+                "created_at": datetime.utcnow(),
+            }
+            for change in changes
+            if change.amount
+        ]
+        if rows:
+            await self.db.execute(insert(BalanceLedgerEntry), rows)
+
+    async def balance_at(self, product_id: UUID, at: datetime) -> Decimal:
+        """Balance of a product at a given date."""
+        return (await self.balances_at([product_id], at))[product_id]
+
+    async def balances_at(
+        self,
+        product_ids: Iterable[UUID],
+        at: datetime,
+        max_entry_id: Optional[int] = None
+    ) -> Dict[UUID, Decimal]:
+        """
+        Balances of several products at a given date, in two queries.
+
+        max_entry_id ignores entries recorded after it (used when taking
+        snapshots so they describe a fixed set of entries).
+        """
+        ids = list(dict.fromkeys(product_ids))
+        if not ids:
+            return {}
+
+        # Latest snapshot at or before `at`, per product
+        snapshot_filters = [
+            BalanceSnapshot.product_id.in_(ids),
+            BalanceSnapshot.as_of <= at,
+        ]
+        if max_entry_id is not None:
+            snapshot_filters.append(BalanceSnapshot.last_entry_id <= max_entry_id)
+        result = await self.db.execute(
+            select(
+                BalanceSnapshot.product_id,
+                BalanceSnapshot.as_of,
+                BalanceSnapshot.balance,
+                BalanceSnapshot.last_entry_id,
+            )
+            .where(*snapshot_filters)
+            .distinct(BalanceSnapshot.product_id)
+            .order_by(BalanceSnapshot.product_id, BalanceSnapshot.as_of.desc())
+        )
+        snapshots = {row.product_id: row for row in result}
+
+        balances = {
+            product_id: snapshots[product_id].balance if product_id in snapshots else Decimal("0")
+            for product_id in ids
+        }
+
+        # Entries after each product's snapshot: later effective date, or
+        # recorded after the snapshot was taken. Per-product bounds are
+        # passed as typed arrays and unnested into a join source.
+        bounds = func.unnest(
+            cast(ids, ARRAY(PG_UUID(as_uuid=True))),
+            cast(
+                [snapshots[pid].as_of if pid in snapshots else _NO_SNAPSHOT for pid in ids],
+                ARRAY(DateTime(timezone=True)),
+            ),
+            cast(
+                [snapshots[pid].last_entry_id if pid in snapshots else 0 for pid in ids],
+                ARRAY(BigInteger),
+            ),
+        ).table_valued("product_id", "as_of", "last_entry_id").render_derived(name="bounds")
+        entry_filters = [
+            BalanceLedgerEntry.effective_at <= at,
+            or_(
+                BalanceLedgerEntry.effective_at > bounds.c.as_of,
+                BalanceLedgerEntry.id > bounds.c.last_entry_id,
+            ),
+        ]
+        if max_entry_id is not None:
+            entry_filters.append(BalanceLedgerEntry.id <= max_entry_id)
+        result = await self.db.execute(
+            select(bounds.c.product_id, func.sum(BalanceLedgerEntry.amount))
+            .join(BalanceLedgerEntry, BalanceLedgerEntry.product_id == bounds.c.product_id)
+            .where(and_(*entry_filters))
+            .group_by(bounds.c.product_id)
+        )
+        for product_id, delta in result:
+            balances[product_id] += delta
+
+        return balances
+
+    async def take_snapshots(self, as_of: Optional[datetime] = None) -> int:
+        """
+        Snapshot every product's balance at as_of (default: start of today,
+        UTC) and commit. Returns number of snapshots written.
+        """
+        if as_of is None:
+            as_of = datetime.combine(datetime.now(timezone.utc).date(), time.min, tzinfo=timezone.utc)
+
+        max_entry_id = await self.db.scalar(select(func.max(BalanceLedgerEntry.id)))
+        if max_entry_id is None:
+            return 0
+
+        product_ids = (await self.db.scalars(select(FinancialProduct.id))).all()
+        balances = await self.balances_at(product_ids, as_of, max_entry_id=max_entry_id)
+        if not balances:
+            return 0
+
+        result = await self.db.execute(
+            pg_insert(BalanceSnapshot)
+            .values([
+                {
+                    "id": uuid4(),
+                    "product_id": product_id,
+                    "as_of": as_of,
+                    "balance": balance,
+                    "last_entry_id": max_entry_id,
+                    "created_at": datetime.utcnow(),
+                }
+                for product_id, balance in balances.items()
+            ])
+            .on_conflict_do_nothing(constraint="uq_balance_snapshot_product_as_of")
+        )
+        await self.db.commit()
+        return result.rowcount
+
+    async def reconcile(self) -> List[Dict[str, Any]]:
+        """
+        Compare stored balances with the ledger and report drift.
+
+        - "balance": FinancialProduct.balance differs from the sum of its
+          ledger entries. Flagged only; money is never corrected silently.
+        - "snapshot": snapshot + delta differs from the full sum (e.g. an
+          entry committed while a snapshot was being taken). Snapshots are
+          derived data, so that product's snapshots are dropped.
+        """
+        result = await self.db.execute(
+            select(
+                FinancialProduct.id,
+                FinancialProduct.user_id,
+                func.coalesce(FinancialProduct.balance, 0),
+                func.coalesce(func.sum(BalanceLedgerEntry.amount), 0),
+            )
+            .outerjoin(BalanceLedgerEntry, BalanceLedgerEntry.product_id == FinancialProduct.id)
+            .group_by(FinancialProduct.id)
+        )
+        rows = result.all()
+        via_snapshots = await self.balances_at([row[0] for row in rows], _END_OF_TIME)
+
+        drifts: List[Dict[str, Any]] = []
+        stale_snapshots = []
+        for product_id, user_id, balance, ledger_balance in rows:
+            if balance != ledger_balance:
+                drifts.append({
+                    "kind": "balance",
+                    "product_id": str(product_id),
+                    "user_id": str(user_id),
+                    "balance": str(balance),
+                    "ledger_balance": str(ledger_balance),
+                    "drift": str(balance - ledger_balance),
+                })
+            if via_snapshots[product_id] != ledger_balance:
+                stale_snapshots.append(product_id)
+                drifts.append({
+                    "kind": "snapshot",
+                    "product_id": str(product_id),
+                    "user_id": str(user_id),
+                    "snapshot_balance": str(via_snapshots[product_id]),
+                    "ledger_balance": str(ledger_balance),
+                })
+
+        if stale_snapshots:
+            await self.db.execute(
+                delete(BalanceSnapshot).where(BalanceSnapshot.product_id.in_(stale_snapshots))
+            )
+            await self.db.commit()
+
+        for drift in drifts:
+            logger.warning(f"Balance drift: {drift}")
+        return drifts
@@ -0,0 +1,173 @@
+"""Projection service - Upcoming installment spending from monthly buckets."""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, delete, and_, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import InstallmentBucket, Transaction, TransactionType
+from app.services.statement_service import ItemChange
+
+# Upper bound for the months a projection may span
+MAX_PROJECTION_MONTHS = 36
+
+
+def _month_of(when: datetime) -> Tuple[int, int]:
+    """(year, month) of a date in UTC; naive dates are taken as UTC."""
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc)
+    return when.year, when.month
+
+
+def _add_months(year: int, month: int, months: int) -> Tuple[int, int]:
+    month = month - 1 + months
+    return year + month // 12, month % 12 + 1
+
+
+class ProjectionService:
+    """
+    Committed future card spending from installment plans.
+
+    Installment expenses are summed per (card, calendar month) into
+    installment_buckets as they are written, so a projection reads at most
+    a few dozen rows off the (user_id, year, month) covering index instead
+    of scanning future-dated transactions.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_projection(
+        self,
+        user_id: UUID,
+        months: int = 6,
+        product_id: Optional[UUID] = None,
+        as_of: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Installments due in each of the next `months` calendar months,
+        starting with as_of's month (default: now). Months with nothing due
+        are included with zero amounts.
+        """
+        if not 1 <= months <= MAX_PROJECTION_MONTHS:
+            raise ValueError(f"months must be between 1 and {MAX_PROJECTION_MONTHS}")
+
+        first = _month_of(as_of or datetime.now(timezone.utc))
+        periods = [_add_months(*first, i) for i in range(months)]
+        end = _add_months(*first, months)
+
+        period = tuple_(InstallmentBucket.year, InstallmentBucket.month)
+        filters = [
+            InstallmentBucket.user_id == user_id,
+            period >= tuple_(*first),
+            period < tuple_(*end),
+        ]
+        if product_id:
+            filters.append(InstallmentBucket.product_id == product_id)
+
+        result = await self.db.execute(
+            select(
+                InstallmentBucket.year,
+                InstallmentBucket.month,
+                func.sum(InstallmentBucket.amount),
+                func.sum(InstallmentBucket.transaction_count),
+            )
+            .where(and_(*filters))
+            .group_by(InstallmentBucket.year, InstallmentBucket.month)
+        )
+        totals = {(year, month): (amount, int(count)) for year, month, amount, count in result}
+
+        projection = []
+        for year, month in periods:
+            amount, count = totals.get((year, month), (Decimal("0"), 0))
+            projection.append({"year": year, "month": month, "amount": amount, "transaction_count": count})
+        return projection
+
+    async def apply_changes(self, changes: Iterable[ItemChange]) -> None:
+        """
+        Move installment expenses between buckets as they are created,
+        edited or deleted, in one upsert. Does not commit.
+        """
+        deltas: Dict[Tuple[UUID, int, int], List[Any]] = {}
+        users: Dict[UUID, UUID] = {}
+
+        def add(card_id: UUID, when: datetime, amount: Decimal, count: int) -> None:
+            delta = deltas.setdefault((card_id, *_month_of(when)), [Decimal("0"), 0])
+            delta[0] += amount
+            delta[1] += count
+
+        for change in changes:
+            users[change.card.id] = change.card.user_id
+            if change.before:
+                add(change.card.id, change.before[0], -change.before[1], -1)
+            if change.after:
+                add(change.card.id, change.after[0], change.after[1], 1)
+
+        rows = [
+            {
+                "product_id": product_id,
+                "year": year,
+                "month": month,
+                "user_id": users[product_id],
+                "amount": amount,
+                "transaction_count": count,
+                "updated_at": datetime.utcnow(),
+            }
+            for (product_id, year, month), (amount, count) in deltas.items()
+            if amount or count
+        ]
+        if not rows:
+            return
+
+        stmt = pg_insert(InstallmentBucket).values(rows)
+        await self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["product_id", "year", "month"],
+                set_={
+                    "amount": InstallmentBucket.amount + stmt.excluded.amount,
+                    "transaction_count": InstallmentBucket.transaction_count + stmt.excluded.transaction_count,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+        )
+
+    async def rebuild(self, user_id: Optional[UUID] = None) -> int:
+        """
+        Recompute buckets from the transactions table (all users, or one)
+        and commit. Returns the number of buckets written.
+        """
+        year = func.extract("year", func.timezone("UTC", Transaction.date)).cast(InstallmentBucket.year.type)
+        month = func.extract("month", func.timezone("UTC", Transaction.date)).cast(InstallmentBucket.month.type)
+        filters = [
+            Transaction.installment_id.isnot(None),
+            Transaction.transaction_type == TransactionType.EXPENSE.value,
+            Transaction.from_product_id.isnot(None),
+        ]
+        bucket_filters = []
+        if user_id:
+            filters.append(Transaction.user_id == user_id)
+            bucket_filters.append(InstallmentBucket.user_id == user_id)
+
+        await self.db.execute(delete(InstallmentBucket).where(*bucket_filters))
+        result = await self.db.execute(
+            pg_insert(InstallmentBucket).from_select(
+                ["product_id", "year", "month", "user_id", "amount", "transaction_count", "updated_at"],
+                select(
+                    Transaction.from_product_id,
+                    year,
+                    month,
+                    Transaction.user_id,
+                    func.sum(Transaction.amount),
+                    func.count(),
+                    func.now(),
+                )
+                .where(and_(*filters))
+                .group_by(Transaction.from_product_id, year, month, Transaction.user_id)
+            )
+        )
+        await self.db.commit()
+        return result.rowcount
@@ -0,0 +1,505 @@
+"""Statement service - Credit card statements (CreditCardSummary) built in SQL."""
+
+import calendar
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import select, update, delete, and_, case, cast, func, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import DateTime
+
+from app.models import (
+    AdjustmentType,
+    CreditCardSummary,
+    FinancialProduct,
+    ProductType,
+    SummaryAdjustment,
+    SummaryItem,
+    SummaryStatus,
+    Transaction,
+    TransactionType,
+)
+
+logger = logging.getLogger(__name__)
+
+# Cards per batch in build_all(); bounds memory and transaction size
+STATEMENT_BATCH_SIZE = 200
+# Days from closing to due date for cards without a due_day
+DEFAULT_DUE_DAYS = 10
+
+
+@dataclass
+class ItemChange:
+    """
+    A card expense as it was before a write and as it is after it, each as
+    (date, amount) or None when the transaction didn't / doesn't exist.
+    """
+    transaction_id: UUID
+    card: FinancialProduct
+    before: Optional[Tuple[datetime, Decimal]] = None
+    after: Optional[Tuple[datetime, Decimal]] = None
+
+
+@dataclass(frozen=True)
+class StatementPeriod:
+    """A card's billing cycle: transactions dated in [start, end) belong to it."""
+    year: int
+    month: int
+    start: datetime
+    end: datetime
+    closing_date: datetime
+    due_date: datetime
+
+
+def _day_in_month(year: int, month: int, day: int) -> datetime:
+    """Midnight (UTC) of `day`, clamped to the month's length."""
+    day = min(day, calendar.monthrange(year, month)[1])
+    return datetime(year, month, day, tzinfo=timezone.utc)
+
+
+def _shift_month(year: int, month: int, months: int) -> Tuple[int, int]:
+    month = month - 1 + months
+    return year + month // 12, month % 12 + 1
+
+
+def statement_period(closing_day: int, due_day: Optional[int], year: int, month: int) -> StatementPeriod:
+    """
+    The statement that closes in (year, month). The cycle runs from the day
+    after the previous closing through the closing day; the due date falls
+    after the closing, in the same month if due_day is later, else the next.
+    """
+    closing_date = _day_in_month(year, month, closing_day)
+    prev_year, prev_month = _shift_month(year, month, -1)
+    start = _day_in_month(prev_year, prev_month, closing_day) + timedelta(days=1)
+
+    if due_day is None:
+        due_date = closing_date + timedelta(days=DEFAULT_DUE_DAYS)
+    elif due_day > closing_date.day:
+        due_date = _day_in_month(year, month, due_day)
+    else:
+        due_date = _day_in_month(*_shift_month(year, month, 1), due_day)
+
+    return StatementPeriod(
+        year=year,
+        month=month,
+        start=start,
+        end=closing_date + timedelta(days=1),
+        closing_date=closing_date,
+        due_date=due_date,
+    )
+
+
+def statement_period_for(closing_day: int, due_day: Optional[int], when: datetime) -> StatementPeriod:
+    """The statement whose cycle contains `when`."""
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    period = statement_period(closing_day, due_day, when.year, when.month)
+    if when >= period.end:
+        period = statement_period(closing_day, due_day, *_shift_month(when.year, when.month, 1))
+    return period
+
+
+class StatementService:
+    """
+    Builds credit card statements set-based.
+
+    For a batch of (card, period) pairs the work is a constant number of
+    statements regardless of how many transactions they hold: one lookup
+    and one multi-row insert for the summaries, one INSERT ... SELECT that
+    pulls every cycle's transactions with a range join, one DELETE for
+    items that left their cycle and one UPDATE that recomputes totals.
+
+    Only DRAFT statements are (re)built; CLOSED and PAID ones are left
+    as they are.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def build_statement(self, product: FinancialProduct, period: StatementPeriod) -> CreditCardSummary:
+        """Build (or refresh) one card's statement for a period and commit."""
+        if product.product_type != ProductType.CREDIT_CARD or not product.closing_day:
+            raise ValueError("Statements are only available for credit cards with a closing day")
+
+        summaries = await self._build_batch([(product, period)])
+        summary_id = summaries.get((product.id, period.year, period.month))
+        if summary_id is None:
+            raise ValueError("Statement is already closed")
+        await self.db.commit()
+
+        result = await self.db.execute(
+            select(CreditCardSummary)
+            .where(CreditCardSummary.id == summary_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one()
+
+    async def build_all(
+        self,
+        as_of: Optional[datetime] = None,
+        batch_size: int = STATEMENT_BATCH_SIZE
+    ) -> Dict[str, int]:
+        """
+        Refresh the current statement of every credit card of every user,
+        plus the previous one while it's still a DRAFT, then close the
+        statements whose closing date has passed.
+
+        Cards are walked in keyset batches, each committed on its own, so
+        memory stays bounded however many cards there are.
+        """
+        as_of = as_of or datetime.now(timezone.utc)
+        cards_done = 0
+        summaries_built = 0
+        last_id: Optional[UUID] = None
+
+        while True:
+            query = (
+                select(FinancialProduct)
+                .where(
+                    FinancialProduct.product_type == ProductType.CREDIT_CARD.value,
+                    FinancialProduct.closing_day.isnot(None),
+                )
+                .order_by(FinancialProduct.id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                query = query.where(FinancialProduct.id > last_id)
+            cards = (await self.db.scalars(query)).all()
+            if not cards:
+                break
+
+            targets = []
+            for card in cards:
+                current = statement_period_for(card.closing_day, card.due_day, as_of)
+                previous = statement_period(
+                    card.closing_day, card.due_day, *_shift_month(current.year, current.month, -1)
+                )
+                targets.extend([(card, previous), (card, current)])
+
+            summaries_built += len(await self._build_batch(targets))
+            await self.db.commit()
+
+            cards_done += len(cards)
+            last_id = cards[-1].id
+            self.db.expunge_all()
+
+        closed = await self.close_due(as_of)
+        return {"cards": cards_done, "summaries": summaries_built, "closed": closed}
+
+    async def close_due(self, as_of: Optional[datetime] = None) -> int:
+        """Mark DRAFT statements whose cycle has ended as CLOSED and commit."""
+        as_of = as_of or datetime.now(timezone.utc)
+        result = await self.db.execute(
+            update(CreditCardSummary)
+            .where(
+                CreditCardSummary.status == SummaryStatus.DRAFT.value,
+                # closing_date is the last day of the cycle
+                CreditCardSummary.closing_date < as_of - timedelta(days=1),
+            )
+            .values(status=SummaryStatus.CLOSED.value, is_closed=True)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount
+
+    async def apply_changes(self, changes: Iterable[ItemChange]) -> None:
+        """
+        Apply transaction writes to the statements they fall in, as deltas.
+
+        DRAFT statements get the affected items upserted or deleted and
+        their totals moved by the difference, so the cost depends on the
+        number of changed transactions, not on the size of the cycle.
+        CLOSED and PAID statements are left untouched and only flagged
+        needs_reconciliation. Cycles without a statement yet are skipped;
+        build_all() creates them from scratch. Does not commit.
+        """
+        deltas: Dict[Tuple[UUID, int, int], Decimal] = {}
+        removed: List[Tuple[Tuple[UUID, int, int], UUID]] = []
+        upserted: List[Tuple[Tuple[UUID, int, int], UUID, Decimal]] = []
+
+        for change in changes:
+            card = change.card
+            if card.product_type != ProductType.CREDIT_CARD or not card.closing_day:
+                continue
+            old_key = self._cycle_key(card, change.before[0]) if change.before else None
+            new_key = self._cycle_key(card, change.after[0]) if change.after else None
+
+            if old_key is not None and old_key != new_key:
+                removed.append((old_key, change.transaction_id))
+                deltas[old_key] = deltas.get(old_key, Decimal("0")) - change.before[1]
+            if new_key is not None:
+                old_amount = change.before[1] if old_key == new_key else Decimal("0")
+                if old_key == new_key and change.after[1] == old_amount:
+                    continue
+                upserted.append((new_key, change.transaction_id, change.after[1]))
+                deltas[new_key] = deltas.get(new_key, Decimal("0")) + change.after[1] - old_amount
+
+        if not deltas:
+            return
+
+        result = await self.db.execute(
+            select(
+                CreditCardSummary.product_id,
+                CreditCardSummary.year,
+                CreditCardSummary.month,
+                CreditCardSummary.id,
+                CreditCardSummary.status,
+            )
+            .where(
+                tuple_(
+                    CreditCardSummary.product_id,
+                    CreditCardSummary.year,
+                    CreditCardSummary.month,
+                ).in_(list(deltas))
+            )
+        )
+        drafts: Dict[Tuple[UUID, int, int], UUID] = {}
+        settled: List[UUID] = []
+        for product_id, year, month, summary_id, status in result:
+            if status == SummaryStatus.DRAFT.value:
+                drafts[(product_id, year, month)] = summary_id
+            else:
+                settled.append(summary_id)
+
+        if settled:
+            await self.db.execute(
+                update(CreditCardSummary)
+                .where(CreditCardSummary.id.in_(settled))
+                .values(needs_reconciliation=True)
+                .execution_options(synchronize_session=False)
+            )
+
+        removed = [(drafts[key], transaction_id) for key, transaction_id in removed if key in drafts]
+        if removed:
+            await self.db.execute(
+                delete(SummaryItem)
+                .where(tuple_(SummaryItem.summary_id, SummaryItem.transaction_id).in_(removed))
+                .execution_options(synchronize_session=False)
+            )
+
+        rows = [
+            {"id": uuid4(), "summary_id": drafts[key], "transaction_id": transaction_id, "amount": amount}
+            for key, transaction_id, amount in upserted
+            if key in drafts
+        ]
+        if rows:
+            stmt = pg_insert(SummaryItem).values(rows)
+            await self.db.execute(
+                stmt.on_conflict_do_update(
+                    constraint="uq_summary_item_summary_transaction",
+                    set_={"amount": stmt.excluded.amount},
+                )
+            )
+
+        totals = {drafts[key]: delta for key, delta in deltas.items() if key in drafts and delta}
+        if totals:
+            delta = case(totals, value=CreditCardSummary.id)
+            await self.db.execute(
+                update(CreditCardSummary)
+                .where(CreditCardSummary.id.in_(list(totals)))
+                .values(
+                    calculated_amount=func.coalesce(CreditCardSummary.calculated_amount, 0) + delta,
+                    total_amount=func.coalesce(CreditCardSummary.total_amount, 0) + delta,
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+    @staticmethod
+    def _cycle_key(card: FinancialProduct, when: datetime) -> Tuple[UUID, int, int]:
+        """(product_id, year, month) of the statement whose cycle contains `when`."""
+        period = statement_period_for(card.closing_day, card.due_day, when)
+        return card.id, period.year, period.month
+
+    # ============== Batch Steps ==============
+
+    async def _build_batch(
+        self,
+        targets: List[Tuple[FinancialProduct, StatementPeriod]]
+    ) -> Dict[Tuple[UUID, int, int], UUID]:
+        """
+        Build the DRAFT statements among `targets`. Returns summary ids by
+        (product_id, year, month) for the ones built. Does not commit.
+        """
+        summaries = await self._ensure_summaries(targets)
+
+        drafts = [
+            (summaries[(product.id, period.year, period.month)][0], product.id, period)
+            for product, period in targets
+            if summaries[(product.id, period.year, period.month)][1] == SummaryStatus.DRAFT.value
+        ]
+        if not drafts:
+            return {}
+
+        await self._sync_items(drafts)
+        await self._recompute_totals(summary_id for summary_id, _, _ in drafts)
+        return {
+            (product_id, period.year, period.month): summary_id
+            for summary_id, product_id, period in drafts
+        }
+
+    async def _ensure_summaries(
+        self,
+        targets: List[Tuple[FinancialProduct, StatementPeriod]]
+    ) -> Dict[Tuple[UUID, int, int], Tuple[UUID, str]]:
+        """
+        Look up the summaries for `targets`, creating missing ones in one
+        insert. A summary another writer created meanwhile wins the
+        conflict and is looked up instead.
+        """
+        keys = [(product.id, period.year, period.month) for product, period in targets]
+        summaries = await self._find_summaries(keys)
+
+        new_rows = {}
+        for product, period in targets:
+            key = (product.id, period.year, period.month)
+            if key in summaries or key in new_rows:
+                continue
+            new_rows[key] = {
+                "id": uuid4(),
+                "year": period.year,
+                "month": period.month,
+                "closing_date": period.closing_date,
+                "due_date": period.due_date,
+                "status": SummaryStatus.DRAFT.value,
+                "is_closed": False,
+                "institution_id": product.institution_id,
+                "product_id": product.id,
+                "user_id": product.user_id,
+            }
+        if new_rows:
+            result = await self.db.execute(
+                pg_insert(CreditCardSummary)
+                .values(list(new_rows.values()))
+                .on_conflict_do_nothing(constraint="uq_summary_product_year_month")
+                .returning(CreditCardSummary.id)
+            )
+            inserted = set(result.scalars().all())
+            lost = []
+            for key, row in new_rows.items():
+                if row["id"] in inserted:
+                    summaries[key] = (row["id"], SummaryStatus.DRAFT.value)
+                else:
+                    lost.append(key)
+            if lost:
+                summaries.update(await self._find_summaries(lost))
+        return summaries
+
+    async def _find_summaries(
+        self,
+        keys: List[Tuple[UUID, int, int]]
+    ) -> Dict[Tuple[UUID, int, int], Tuple[UUID, str]]:
+        """(id, status) of the existing summaries for (product_id, year, month) keys."""
+        result = await self.db.execute(
+            select(
+                CreditCardSummary.product_id,
+                CreditCardSummary.year,
+                CreditCardSummary.month,
+                CreditCardSummary.id,
+                CreditCardSummary.status,
+            )
+            .where(
+                tuple_(
+                    CreditCardSummary.product_id,
+                    CreditCardSummary.year,
+                    CreditCardSummary.month,
+                ).in_(keys)
+            )
+        )
+        return {
+            (product_id, year, month): (summary_id, status)
+            for product_id, year, month, summary_id, status in result
+        }
+
+    async def _sync_items(self, drafts: List[Tuple[UUID, UUID, StatementPeriod]]) -> None:
+        """Make each draft's items match the card's expenses dated in its cycle."""
+        summary_ids = [summary_id for summary_id, _, _ in drafts]
+        cycles = func.unnest(
+            cast(summary_ids, ARRAY(PG_UUID(as_uuid=True))),
+            cast([product_id for _, product_id, _ in drafts], ARRAY(PG_UUID(as_uuid=True))),
+            cast([period.start for _, _, period in drafts], ARRAY(DateTime(timezone=True))),
+            cast([period.end for _, _, period in drafts], ARRAY(DateTime(timezone=True))),
+        ).table_valued("summary_id", "product_id", "starts", "ends").render_derived(name="cycles")
+
+        in_cycle = (
+            select(cycles.c.summary_id, Transaction.id, Transaction.amount)
+            .select_from(cycles)
+            .join(
+                Transaction,
+                and_(
+                    Transaction.from_product_id == cycles.c.product_id,
+                    Transaction.date >= cycles.c.starts,
+                    Transaction.date < cycles.c.ends,
+                    Transaction.transaction_type == TransactionType.EXPENSE.value,
+                ),
+            )
+        )
+
+        # Items for transactions that moved out of the cycle (date edited,
+        # deleted rows cascade on their own)
+        await self.db.execute(
+            delete(SummaryItem)
+            .where(
+                SummaryItem.summary_id.in_(summary_ids),
+                tuple_(SummaryItem.summary_id, SummaryItem.transaction_id).not_in(
+                    in_cycle.with_only_columns(cycles.c.summary_id, Transaction.id)
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        # Add new items and refresh amounts of existing ones; reconciliation
+        # flags and notes on existing items are kept
+        stmt = pg_insert(SummaryItem).from_select(
+            ["id", "summary_id", "transaction_id", "amount"],
+            in_cycle.with_only_columns(
+                func.gen_random_uuid(), cycles.c.summary_id, Transaction.id, Transaction.amount
+            ),
+        )
+        await self.db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_summary_item_summary_transaction",
+                set_={"amount": stmt.excluded.amount},
+                where=SummaryItem.amount != stmt.excluded.amount,
+            )
+        )
+
+    async def _recompute_totals(self, summary_ids: Iterable[UUID]) -> None:
+        """Recompute calculated/adjustments/total amounts in one UPDATE."""
+        calculated = func.coalesce(
+            select(func.sum(SummaryItem.amount))
+            .where(SummaryItem.summary_id == CreditCardSummary.id)
+            .scalar_subquery(),
+            0,
+        )
+        # Credits lower the statement whatever sign they were entered with
+        adjustments = func.coalesce(
+            select(
+                func.sum(
+                    case(
+                        (
+                            SummaryAdjustment.adjustment_type == AdjustmentType.CREDIT.value,
+                            -func.abs(SummaryAdjustment.amount),
+                        ),
+                        else_=SummaryAdjustment.amount,
+                    )
+                )
+            )
+            .where(SummaryAdjustment.summary_id == CreditCardSummary.id)
+            .scalar_subquery(),
+            0,
+        )
+        await self.db.execute(
+            update(CreditCardSummary)
+            .where(CreditCardSummary.id.in_(list(summary_ids)))
+            .values(
+                calculated_amount=calculated,
+                adjustments_amount=adjustments,
+                total_amount=calculated + adjustments,
+            )
+            .execution_options(synchronize_session=False)
+        )
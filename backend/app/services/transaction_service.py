@@ -1,39 +1,94 @@
 """Transaction service - Business logic for transactions and transfers."""
 
-from datetime import datetime, timedelta
-from decimal import Decimal
-from typing import Dict, List, Optional
+import base64
+import logging
+import struct
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from uuid import UUID, uuid4
 
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, insert, update, and_, case, desc, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.cache import invalidate_tags
 from app.models import (
     Transaction,
     FinancialProduct,
     TransactionType,
     ProductType,
     Category,
+    LedgerReason,
 )
+from app.services.ledger_service import BalanceChange, LedgerService
+from app.services.projection_service import ProjectionService
+from app.services.statement_service import ItemChange, StatementService
 from app.schemas import TransactionCreate, TransactionUpdate, TransferCreate
 
+logger = logging.getLogger(__name__)
+
+_CURSOR_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_CURSOR_FORMAT = ">q16s"  # microseconds since epoch + transaction UUID bytes
+
+
+def encode_cursor(date: datetime, transaction_id: UUID) -> str:
+    """Encode a (date, id) keyset position as an opaque URL-safe cursor."""
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    micros = (date - _CURSOR_EPOCH) // timedelta(microseconds=1)
+    raw = struct.pack(_CURSOR_FORMAT, micros, transaction_id.bytes)
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        micros, id_bytes = struct.unpack(_CURSOR_FORMAT, raw)
+    except (ValueError, struct.error) as e:
+        raise ValueError("Invalid pagination cursor") from e
+    return _CURSOR_EPOCH + timedelta(microseconds=micros), UUID(bytes=id_bytes)
+
+
+def split_installments(amount: Decimal, installments: int) -> List[Decimal]:
+    """
+    Split an amount into installments that add up to it exactly (to the
+    cent). Leftover cents go one each to the first installments, e.g.
+    100.00 / 3 -> 33.34, 33.33, 33.33.
+    """
+    cents = int((amount * 100).to_integral_value(rounding=ROUND_HALF_UP))
+    base, remainder = divmod(cents, installments)
+    return [Decimal(base + (1 if i < remainder else 0)).scaleb(-2) for i in range(installments)]
+
+
+# Grouping expressions accepted by TransactionService.get_transaction_summary
+SUMMARY_GROUPINGS = {
+    "day": lambda: func.date_trunc("day", Transaction.date),
+    "week": lambda: func.date_trunc("week", Transaction.date),
+    "month": lambda: func.date_trunc("month", Transaction.date),
+    "category": lambda: Transaction.category_id,
+    "product": lambda: func.coalesce(Transaction.from_product_id, Transaction.to_product_id),
+}
+
 
 class TransactionService:
     """Service for managing transactions, including installments and transfers."""
     
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.ledger = LedgerService(db)
+        self.statements = StatementService(db)
+        self.projections = ProjectionService(db)
     
-    async def get_transactions(
+    def _transactions_query(
         self,
         user_id: UUID,
         product_id: Optional[UUID] = None,
         category_id: Optional[UUID] = None,
         transaction_type: Optional[str] = None,
-        limit: int = 100,
-        offset: int = 0
-    ) -> List[Transaction]:
-        """Get transactions with optional filters."""
+    ):
+        """Build the filtered transactions query shared by offset and cursor pagination."""
         query = select(Transaction).where(Transaction.user_id == user_id)
         
         if product_id:
@@ -50,12 +105,64 @@ class TransactionService:
         if transaction_type:
             query = query.where(Transaction.transaction_type == transaction_type)
         
+        return query
+    
+    async def get_transactions(
+        self,
+        user_id: UUID,
+        product_id: Optional[UUID] = None,
+        category_id: Optional[UUID] = None,
+        transaction_type: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[Transaction]:
+        """Get transactions with optional filters."""
+        query = self._transactions_query(user_id, product_id, category_id, transaction_type)
         query = query.order_by(desc(Transaction.date))
         query = query.offset(offset).limit(limit)
         
         result = await self.db.execute(query)
         return result.scalars().all()
     
+    async def get_transactions_page(
+        self,
+        user_id: UUID,
+        product_id: Optional[UUID] = None,
+        category_id: Optional[UUID] = None,
+        transaction_type: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Transaction], Optional[str]]:
+        """
+        Get a page of transactions using keyset pagination on (date, id).
+        
+        Unlike offset pagination, the cost of fetching a page does not grow
+        with its depth: the cursor is turned into a range condition that rides
+        the (user_id, date) index. Returns the page and the cursor for the next
+        one (None when there are no more rows).
+        """
+        query = self._transactions_query(user_id, product_id, category_id, transaction_type)
+        
+        if cursor:
+            cursor_date, cursor_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(Transaction.date, Transaction.id) < tuple_(cursor_date, cursor_id)
+            )
+        
+        # Fetch one extra row to know whether another page exists
+        query = query.order_by(desc(Transaction.date), desc(Transaction.id)).limit(limit + 1)
+        
+        result = await self.db.execute(query)
+        transactions = list(result.scalars().all())
+        
+        next_cursor = None
+        if len(transactions) > limit:
+            transactions = transactions[:limit]
+            last = transactions[-1]
+            next_cursor = encode_cursor(last.date, last.id)
+        
+        return transactions, next_cursor
+    
     async def get_transaction(self, transaction_id: UUID, user_id: UUID) -> Optional[Transaction]:
         """Get a specific transaction."""
         result = await self.db.execute(
@@ -69,6 +176,37 @@ class TransactionService:
         )
         return result.scalar_one_or_none()
     
+    async def _lock_transaction(
+        self,
+        transaction_id: UUID,
+        user_id: UUID
+    ) -> Tuple[Optional[Transaction], Dict[UUID, FinancialProduct]]:
+        """
+        Load a transaction FOR UPDATE and lock the products its balance
+        effects touch (including a debit card's linked account), so
+        concurrent edits or deletes of it apply one after the other.
+        """
+        result = await self.db.execute(
+            select(Transaction)
+            .where(
+                and_(
+                    Transaction.id == transaction_id,
+                    Transaction.user_id == user_id
+                )
+            )
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        transaction = result.scalar_one_or_none()
+        if not transaction:
+            return None, {}
+        
+        product_ids = {transaction.from_product_id, transaction.to_product_id}
+        products = await self._get_products(product_ids, user_id)
+        product_ids.update(product.linked_product_id for product in products.values())
+        products = await self._get_products(product_ids, user_id, for_update=True)
+        return transaction, products
+    
     async def get_installment_group(
         self,
         installment_id: UUID,
@@ -87,6 +225,77 @@ class TransactionService:
         )
         return result.scalars().all()
     
+    async def get_outstanding_installments(
+        self,
+        user_id: UUID,
+        product_id: Optional[UUID] = None,
+        as_of: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Installment plans that still have installments dated after as_of
+        (default: now), optionally for one card. One aggregated row per
+        plan, soonest next installment first.
+        """
+        as_of = as_of or datetime.now(timezone.utc)
+        pending = Transaction.date > as_of
+        
+        filters = [
+            Transaction.user_id == user_id,
+            Transaction.installment_id.isnot(None),
+        ]
+        if product_id:
+            filters.append(Transaction.from_product_id == product_id)
+        
+        result = await self.db.execute(
+            select(
+                Transaction.installment_id,
+                Transaction.from_product_id,
+                Transaction.installment_total,
+                func.min(Transaction.description).filter(Transaction.installment_number == 1).label("description"),
+                func.sum(Transaction.amount).label("total_amount"),
+                func.count().filter(pending).label("installments_remaining"),
+                func.coalesce(func.sum(Transaction.amount).filter(pending), 0).label("remaining_amount"),
+                func.min(Transaction.date).filter(pending).label("next_date"),
+                func.max(Transaction.date).label("last_date"),
+            )
+            .where(and_(*filters))
+            .group_by(Transaction.installment_id, Transaction.from_product_id, Transaction.installment_total)
+            .having(func.count().filter(pending) > 0)
+            .order_by(func.min(Transaction.date).filter(pending))
+        )
+        
+        plans = []
+        for row in result:
+            description = row.description or ""
+            suffix = description.rfind(" (Cuota ")
+            plans.append({
+                "installment_id": row.installment_id,
+                "product_id": row.from_product_id,
+                "description": description[:suffix] if suffix != -1 else description,
+                "installment_total": row.installment_total,
+                "installments_paid": row.installment_total - row.installments_remaining,
+                "installments_remaining": row.installments_remaining,
+                "total_amount": row.total_amount,
+                "remaining_amount": row.remaining_amount,
+                "next_date": row.next_date,
+                "last_date": row.last_date,
+            })
+        return plans
+    
+    async def _invalidate_caches(self, user_id: UUID, product_ids: Iterable[Optional[UUID]] = ()) -> None:
+        """
+        Drop cached reads derived from data a write just committed.
+        
+        Runs after the commit; a cache failure is logged, not raised, since
+        the write itself already succeeded.
+        """
+        tags = [f"user:{user_id}"]
+        tags.extend(f"product:{product_id}" for product_id in product_ids if product_id)
+        try:
+            await invalidate_tags(tags)
+        except Exception as e:
+            logger.error(f"Cache invalidation failed for {tags}: {e}")
+    
     async def _get_product(self, product_id: UUID, user_id: UUID) -> Optional[FinancialProduct]:
         """Helper to get a product."""
         result = await self.db.execute(
@@ -103,82 +312,49 @@ class TransactionService:
     async def _validate_credit_card_limit(
         self,
         product: FinancialProduct,
-        amount: Decimal,
-        is_installment: bool
+        amount: Decimal
     ) -> None:
-        """Validate credit card has sufficient limit."""
-        if product.product_type != ProductType.CREDIT_CARD:
-            return
-        
-        # Check if product has any limits set
-        has_limits = (
-            product.limit_amount is not None or
-            product.limit_single_payment is not None or
-            product.limit_installments is not None
-        )
-        
-        if not has_limits:
+        """Validate credit card has sufficient limit (product should be locked)."""
+        if product.product_type != ProductType.CREDIT_CARD or product.limit_amount is None:
             return
         
         available = product.available_limit
-        
-        if product.unified_limit:
-            # Unified limit check
-            if available < amount:
-                raise ValueError(
-                    f"Insufficient credit limit. Available: ${float(available):.2f}, "
-                    f"Required: ${float(amount):.2f}"
-                )
-        else:
-            # Separate limits for single payment and installments
-            if is_installment:
-                limit = product.limit_installments or product.limit_amount or Decimal("0")
-                current_balance = abs(product.balance) if product.balance < 0 else Decimal("0")
-                available_installment = limit - current_balance
-                
-                if available_installment < amount:
-                    raise ValueError(
-                        f"Insufficient installment limit. Available: ${float(available_installment):.2f}, "
-                        f"Required: ${float(amount):.2f}"
-                    )
-            else:
-                limit = product.limit_single_payment or product.limit_amount or Decimal("0")
-                current_balance = abs(product.balance) if product.balance < 0 else Decimal("0")
-                available_single = limit - current_balance
-                
-                if available_single < amount:
-                    raise ValueError(
-                        f"Insufficient single payment limit. Available: ${float(available_single):.2f}, "
-                        f"Required: ${float(amount):.2f}"
-                    )
-    
-    async def _update_product_balance(
-        self,
-        product: FinancialProduct,
-        amount_change: Decimal
-    ) -> None:
-        """Update product balance."""
-        product.balance += amount_change
-        
-        # Update limits for credit cards
-        if product.product_type == ProductType.CREDIT_CARD:
-            has_limits = (
-                product.limit_single_payment is not None or
-                product.limit_installments is not None or
-                product.limit_amount is not None
+        if available < amount:
+            raise ValueError(
+                f"Insufficient credit limit. Available: ${float(available):.2f}, "
+                f"Required: ${float(amount):.2f}"
             )
-            
-            if has_limits:
-                if product.unified_limit:
-                    if product.limit_single_payment is not None:
-                        product.limit_single_payment += amount_change
-                    if product.limit_installments is not None:
-                        product.limit_installments += amount_change
-                else:
-                    # Update the specific limit that was used
-                    # This is simplified - in real scenario track which limit was used
-                    if product.limit_single_payment is not None:
-                        product.limit_single_payment += amount_change
+    
+    @staticmethod
+    def _balance_effects(
+        transaction: Transaction,
+        amount: Decimal,
+        products: Dict[UUID, FinancialProduct]
+    ) -> Dict[UUID, Decimal]:
+        """
+        Balance changes `amount` of a transaction causes, by product id:
+        expenses reduce the source (the linked account for debit cards),
+        income increases the destination, transfers do both.
+        """
+        effects: Dict[UUID, Decimal] = {}
+        
+        def add(product_id: Optional[UUID], delta: Decimal) -> None:
+            if product_id:
+                effects[product_id] = effects.get(product_id, Decimal("0")) + delta
+        
+        transaction_type = transaction.transaction_type
+        if transaction_type in (TransactionType.EXPENSE, TransactionType.TRANSFER):
+            source_id = transaction.from_product_id
+            source = products.get(source_id)
+            if (
+                transaction_type == TransactionType.EXPENSE and source is not None
+                and source.product_type == ProductType.DEBIT_CARD and source.linked_product_id
+            ):
+                source_id = source.linked_product_id
+            add(source_id, -amount)
+        if transaction_type in (TransactionType.INCOME, TransactionType.TRANSFER):
+            add(transaction.to_product_id, amount)
+        return effects
     
     async def create_transaction(
         self,
@@ -206,21 +382,27 @@ class TransactionService:
         if is_installment and product.product_type != ProductType.CREDIT_CARD:
             raise ValueError("Installments only allowed for credit cards")
         
-        # Generate installment group ID if needed
-        installment_id = uuid4() if is_installment else None
-        installment_amount = data.amount / installments
+        # Debit card spending comes out of the linked account
+        target_id = product.id
+        if product.product_type == ProductType.DEBIT_CARD:
+            if not product.linked_product_id:
+                raise ValueError("Debit card must be linked to an account")
+            target_id = product.linked_product_id
+        
+        # Lock the products involved until commit, so the checks below see the
+        # balance the update will apply to
+        locked = await self._get_products({product.id, target_id}, user_id, for_update=True)
+        product = locked[product.id]
+        
         total_amount = data.amount
         
         # Validate limits for credit cards
-        if product.product_type == ProductType.CREDIT_CARD:
-            await self._validate_credit_card_limit(product, total_amount, is_installment)
+        if product.product_type == ProductType.CREDIT_CARD and data.transaction_type == TransactionType.EXPENSE:
+            await self._validate_credit_card_limit(product, total_amount)
         
         # Validate debit card has linked account with sufficient balance
         if product.product_type == ProductType.DEBIT_CARD:
-            if not product.linked_product_id:
-                raise ValueError("Debit card must be linked to an account")
-            
-            linked_product = await self._get_product(product.linked_product_id, user_id)
+            linked_product = locked.get(target_id)
             if not linked_product:
                 raise ValueError("Linked account not found")
             
@@ -230,54 +412,24 @@ class TransactionService:
                     f"Available: ${float(linked_product.balance):.2f}"
                 )
         
-        # Create transactions (one per installment)
-        created_transactions = []
-        
-        for i in range(installments):
-            # Calculate date for this installment
-            transaction_date = data.date
-            if i > 0:
-                # Add months for future installments
-                transaction_date = self._add_months(data.date, i)
-            
-            # Build description
-            description = data.description
-            if is_installment:
-                description = f"{data.description} (Cuota {i+1}/{installments})"
-            
-            transaction = Transaction(
-                amount=installment_amount,
-                date=transaction_date,
-                description=description,
-                transaction_type=data.transaction_type,
-                category_id=data.category_id,
-                user_id=user_id,
-                from_product_id=data.from_product_id if data.transaction_type == TransactionType.EXPENSE else None,
-                to_product_id=data.from_product_id if data.transaction_type == TransactionType.INCOME else None,
-                installment_number=i+1 if is_installment else None,
-                installment_total=installments if is_installment else None,
-                installment_id=installment_id,
-                plan_z=data.plan_z if i == 0 else False,  # Plan Z only on first installment
-            )
-            
-            self.db.add(transaction)
-            created_transactions.append(transaction)
+        # Whole schedule in one multi-row INSERT ... RETURNING
+        created_transactions = await self._insert_transactions(
+            self._build_transaction_rows(data, user_id)
+        )
         
         # Update product balance
         balance_change = -total_amount if data.transaction_type == TransactionType.EXPENSE else total_amount
-        
-        if product.product_type == ProductType.DEBIT_CARD:
-            # Update linked account balance
-            linked_product = await self._get_product(product.linked_product_id, user_id)
-            linked_product.balance += balance_change
-        else:
-            await self._update_product_balance(product, balance_change)
+        await self._apply_balance_changes({target_id: balance_change}, locked)
+        await self.ledger.record([
+            BalanceChange(target_id, balance_change, data.date, created_transactions[0].id)
+        ])
+        items = self._new_statement_items(created_transactions, locked)
+        await self.statements.apply_changes(items)
+        if is_installment:
+            await self.projections.apply_changes(items)
         
         await self.db.commit()
-        
-        # Refresh all transactions
-        for transaction in created_transactions:
-            await self.db.refresh(transaction)
+        await self._invalidate_caches(user_id, [product.id, product.linked_product_id])
         
         return created_transactions
     
@@ -288,12 +440,13 @@ class TransactionService:
         user_id: UUID
     ) -> Optional[Transaction]:
         """Update a transaction."""
-        transaction = await self.get_transaction(transaction_id, user_id)
+        transaction, products = await self._lock_transaction(transaction_id, user_id)
         if not transaction:
             return None
         
         # Calculate amount difference
         old_amount = transaction.amount
+        old_date = transaction.date
         new_amount = data.amount if data.amount is not None else old_amount
         amount_diff = new_amount - old_amount
         
@@ -309,15 +462,42 @@ class TransactionService:
         if data.plan_z is not None:
             transaction.plan_z = data.plan_z
         
-        # If amount changed, update product balance
+        # If amount changed, apply the difference to the balances it affected
         if amount_diff != 0:
-            if transaction.from_product_id:
-                product = await self._get_product(transaction.from_product_id, user_id)
-                if product:
-                    if transaction.transaction_type == TransactionType.EXPENSE:
-                        await self._update_product_balance(product, -amount_diff)
-                    elif transaction.transaction_type == TransactionType.INCOME:
-                        await self._update_product_balance(product, amount_diff)
+            changes = self._balance_effects(transaction, amount_diff, products)
+            await self._apply_balance_changes(changes, products)
+        
+        # Ledger: a moved transaction leaves its old date (reversal of the old
+        # amount) and lands on the new one; otherwise only the difference
+        if transaction.date != old_date:
+            entries = [
+                (old_date, self._balance_effects(transaction, -old_amount, products)),
+                (transaction.date, self._balance_effects(transaction, transaction.amount, products)),
+            ]
+        else:
+            entries = [(transaction.date, self._balance_effects(transaction, amount_diff, products))]
+        await self.ledger.record(
+            [
+                BalanceChange(product_id, delta, effective_at, transaction.id)
+                for effective_at, effects in entries
+                for product_id, delta in effects.items()
+            ],
+            LedgerReason.ADJUSTMENT,
+        )
+        
+        # Move the statement item if the amount or the cycle changed
+        card = products.get(transaction.from_product_id)
+        if transaction.transaction_type == TransactionType.EXPENSE and card is not None:
+            items = [
+                ItemChange(
+                    transaction.id, card,
+                    before=(old_date, old_amount),
+                    after=(transaction.date, transaction.amount),
+                )
+            ]
+            await self.statements.apply_changes(items)
+            if transaction.installment_id:
+                await self.projections.apply_changes(items)
         
         # If part of installment group, update category for all
         if transaction.installment_id and data.category_id is not None:
@@ -333,44 +513,58 @@ class TransactionService:
             # Would need to update all here
         
         await self.db.commit()
+        await self._invalidate_caches(
+            user_id, [transaction.from_product_id, transaction.to_product_id]
+        )
         await self.db.refresh(transaction)
         return transaction
     
     async def delete_transaction(self, transaction_id: UUID, user_id: UUID) -> bool:
         """Delete a transaction and revert balance changes."""
-        transaction = await self.get_transaction(transaction_id, user_id)
+        transaction, products = await self._lock_transaction(transaction_id, user_id)
         if not transaction:
             return False
         
         # Revert balance changes
-        if transaction.from_product_id:
-            product = await self._get_product(transaction.from_product_id, user_id)
-            if product:
-                if transaction.transaction_type == TransactionType.EXPENSE:
-                    # Revert expense - add money back
-                    await self._update_product_balance(product, transaction.amount)
-                elif transaction.transaction_type == TransactionType.INCOME:
-                    # Revert income - subtract money
-                    await self._update_product_balance(product, -transaction.amount)
-        
-        if transaction.to_product_id and transaction.transaction_type == TransactionType.TRANSFER:
-            product = await self._get_product(transaction.to_product_id, user_id)
-            if product:
-                await self._update_product_balance(product, -transaction.amount)
-        
+        reversals = self._balance_effects(transaction, -transaction.amount, products)
+        await self._apply_balance_changes(reversals, products)
+        await self.ledger.record(
+            [
+                BalanceChange(product_id, delta, transaction.date, transaction.id)
+                for product_id, delta in reversals.items()
+            ],
+            LedgerReason.REVERSAL,
+        )
+        card = products.get(transaction.from_product_id)
+        if transaction.transaction_type == TransactionType.EXPENSE and card is not None:
+            items = [ItemChange(transaction.id, card, before=(transaction.date, transaction.amount))]
+            await self.statements.apply_changes(items)
+            if transaction.installment_id:
+                await self.projections.apply_changes(items)
+        
+        product_ids = list(reversals)
         await self.db.delete(transaction)
         await self.db.commit()
+        await self._invalidate_caches(user_id, product_ids)
         return True
     
     async def create_transfer(self, data: TransferCreate, user_id: UUID) -> Transaction:
         """Create a transfer between products."""
+        if data.from_product_id == data.to_product_id:
+            raise ValueError("Cannot transfer to the same product")
+        
+        # Lock both products (in id order) until commit
+        products = await self._get_products(
+            [data.from_product_id, data.to_product_id], user_id, for_update=True
+        )
+        
         # Validate source product
-        from_product = await self._get_product(data.from_product_id, user_id)
+        from_product = products.get(data.from_product_id)
         if not from_product:
             raise ValueError("Source product not found")
         
         # Validate destination product
-        to_product = await self._get_product(data.to_product_id, user_id)
+        to_product = products.get(data.to_product_id)
         if not to_product:
             raise ValueError("Destination product not found")
         
@@ -382,6 +576,7 @@ class TransactionService:
         
         # Create transfer transaction
         transaction = Transaction(
+            id=uuid4(),
             amount=data.amount,
             date=data.date,
             description=data.description,
@@ -392,11 +587,15 @@ class TransactionService:
         )
         
         # Update balances
-        from_product.balance -= data.amount
-        to_product.balance += data.amount
-        
         self.db.add(transaction)
+        changes = self._balance_effects(transaction, data.amount, products)
+        await self._apply_balance_changes(changes, products)
+        await self.ledger.record([
+            BalanceChange(product_id, delta, data.date, transaction.id)
+            for product_id, delta in changes.items()
+        ])
         await self.db.commit()
+        await self._invalidate_caches(user_id, [data.from_product_id, data.to_product_id])
         await self.db.refresh(transaction)
         
         return transaction
@@ -415,6 +614,135 @@ class TransactionService:
     
     # ============== Batch Operations ==============
     
+    async def _get_products(
+        self,
+        product_ids: Iterable[Optional[UUID]],
+        user_id: UUID,
+        for_update: bool = False
+    ) -> Dict[UUID, FinancialProduct]:
+        """
+        Fetch several products in a single IN (...) query, keyed by id.
+        
+        With for_update the rows stay locked until commit. They are locked
+        in id order, so writers touching overlapping products queue up
+        instead of deadlocking.
+        """
+        product_ids = {product_id for product_id in product_ids if product_id}
+        if not product_ids:
+            return {}
+        query = (
+            select(FinancialProduct)
+            .where(
+                and_(
+                    FinancialProduct.id.in_(product_ids),
+                    FinancialProduct.user_id == user_id
+                )
+            )
+        )
+        if for_update:
+            query = (
+                query.order_by(FinancialProduct.id)
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+        result = await self.db.execute(query)
+        return {product.id: product for product in result.scalars().all()}
+    
+    def _build_transaction_rows(
+        self,
+        data: TransactionCreate,
+        user_id: UUID
+    ) -> List[Dict[str, Any]]:
+        """Build the insert rows for a transaction, one per installment."""
+        installments = data.installments or 1
+        is_installment = installments > 1
+        installment_id = uuid4() if is_installment else None
+        amounts = split_installments(data.amount, installments)
+        
+        rows = []
+        for i, installment_amount in enumerate(amounts):
+            description = data.description
+            if is_installment:
+                description = f"{data.description} (Cuota {i+1}/{installments})"
+            
+            rows.append({
+                "id": uuid4(),
+                "amount": installment_amount,
+                "date": self._add_months(data.date, i) if i > 0 else data.date,
+                "description": description,
+                "transaction_type": data.transaction_type,
+                "category_id": data.category_id,
+                "user_id": user_id,
+                "from_product_id": data.from_product_id if data.transaction_type == TransactionType.EXPENSE else None,
+                "to_product_id": data.from_product_id if data.transaction_type == TransactionType.INCOME else None,
+                "installment_number": i+1 if is_installment else None,
+                "installment_total": installments if is_installment else None,
+                "installment_id": installment_id,
+                "plan_z": data.plan_z if i == 0 else False,  # Plan Z only on first installment
+            })
+        return rows
+    
+    async def _insert_transactions(self, rows: List[Dict[str, Any]]) -> List[Transaction]:
+        """Insert rows with multi-row INSERT ... RETURNING, preserving input order."""
+        if not rows:
+            return []
+        result = await self.db.scalars(
+            insert(Transaction).returning(Transaction, sort_by_parameter_order=True),
+            rows,
+        )
+        return list(result.all())
+    
+    @staticmethod
+    def _new_statement_items(
+        transactions: List[Transaction],
+        products: Dict[UUID, FinancialProduct]
+    ) -> List[ItemChange]:
+        """Statement items new expenses add to their cards' statements."""
+        return [
+            ItemChange(transaction.id, products[transaction.from_product_id], after=(transaction.date, transaction.amount))
+            for transaction in transactions
+            if transaction.transaction_type == TransactionType.EXPENSE
+            and transaction.from_product_id in products
+        ]
+    
+    async def _apply_balance_changes(
+        self,
+        changes: Dict[UUID, Decimal],
+        products: Optional[Dict[UUID, FinancialProduct]] = None
+    ) -> None:
+        """
+        Apply per-product balance deltas with one set-based UPDATE.
+        
+        The new balance is computed by the database (balance = balance +
+        delta), so concurrent writers can't lose each other's updates. Rows
+        are locked in id order within the same statement. Loaded products
+        passed in `products` get the returned balances.
+        """
+        changes = {pid: delta for pid, delta in changes.items() if delta}
+        if not changes:
+            return
+        locked = (
+            select(FinancialProduct.id)
+            .where(FinancialProduct.id.in_(changes))
+            .order_by(FinancialProduct.id)
+            .with_for_update()
+            .subquery()
+        )
+        result = await self.db.execute(
+            update(FinancialProduct)
+            .where(FinancialProduct.id == locked.c.id)
+            .values(
+                balance=func.coalesce(FinancialProduct.balance, 0)
+                + case(changes, value=FinancialProduct.id)
+            )
+            .returning(FinancialProduct.id, FinancialProduct.balance)
+            .execution_options(synchronize_session=False)
+        )
+        for product_id, balance in result:
+            if products and product_id in products:
+                # Reflect the new value without marking the object dirty
+                set_committed_value(products[product_id], "balance", balance)
+    
     async def batch_create_transactions(
         self,
         transactions_data: List[TransactionCreate],
@@ -423,62 +751,85 @@ class TransactionService:
         """
         Create multiple transactions efficiently in a single batch.
         
-        This is more efficient than calling create_transaction multiple times
-        because it minimizes database round trips.
+        Round trips are constant regardless of batch size: one IN (...)
+        fetch for the referenced products, one that locks them together
+        with the accounts linked to debit cards, multi-row INSERT ...
+        RETURNING for the transactions and a single UPDATE for all balance
+        changes.
         """
-        all_transactions = []
-        products_to_update: Dict[UUID, Decimal] = {}
+        if not transactions_data:
+            return []
+        
+        products = await self._get_products(
+            (data.from_product_id for data in transactions_data), user_id
+        )
+        linked_ids = {
+            p.linked_product_id for p in products.values()
+            if p.product_type == ProductType.DEBIT_CARD and p.linked_product_id
+        }
+        # Lock everything whose balance is checked or changed, in id order
+        products = await self._get_products(products.keys() | linked_ids, user_id, for_update=True)
+        
+        rows: List[Dict[str, Any]] = []
+        balance_changes: Dict[UUID, Decimal] = {}
+        ledger_changes: List[BalanceChange] = []
         
-        # First pass: validate all transactions and collect products to update
+        # Validate everything before writing anything
         for data in transactions_data:
-            product = await self._get_product(data.from_product_id, user_id)
+            product = products.get(data.from_product_id)
             if not product:
                 raise ValueError(f"Source product not found: {data.from_product_id}")
             
-            # For simplicity, only handle single-installment transactions in batch
+            if data.transaction_type == TransactionType.INCOME:
+                if product.product_type in [ProductType.CREDIT_CARD, ProductType.LOAN]:
+                    raise ValueError("Cannot add income to credit cards or loans")
+            
+            is_installment = (data.installments or 1) > 1
+            if is_installment and product.product_type != ProductType.CREDIT_CARD:
+                raise ValueError("Installments only allowed for credit cards")
+            
             if data.transaction_type == TransactionType.EXPENSE:
-                if product.product_type == ProductType.CREDIT_CARD:
-                    await self._validate_credit_card_limit(product, data.amount, False)
-                
                 balance_change = -data.amount
-                if data.from_product_id in products_to_update:
-                    products_to_update[data.from_product_id] += balance_change
-                else:
-                    products_to_update[data.from_product_id] = balance_change
-            
+                if product.product_type == ProductType.CREDIT_CARD:
+                    # Count earlier rows of this batch against the limit too
+                    pending = balance_changes.get(product.id, Decimal("0"))
+                    await self._validate_credit_card_limit(product, data.amount - pending)
             elif data.transaction_type == TransactionType.INCOME:
                 balance_change = data.amount
-                if data.from_product_id in products_to_update:
-                    products_to_update[data.from_product_id] += balance_change
-                else:
-                    products_to_update[data.from_product_id] = balance_change
-        
-        # Second pass: create all transactions
-        for data in transactions_data:
-            transaction = Transaction(
-                amount=data.amount,
-                date=data.date,
-                description=data.description,
-                transaction_type=data.transaction_type,
-                category_id=data.category_id,
-                user_id=user_id,
-                from_product_id=data.from_product_id if data.transaction_type == TransactionType.EXPENSE else None,
-                to_product_id=data.from_product_id if data.transaction_type == TransactionType.INCOME else None,
-            )
-            self.db.add(transaction)
-            all_transactions.append(transaction)
-        
-        # Third pass: update all product balances
-        for product_id, total_change in products_to_update.items():
-            product = await self._get_product(product_id, user_id)
-            if product:
-                await self._update_product_balance(product, total_change)
-        
+            else:
+                balance_change = Decimal("0")
+            
+            target_id = product.id
+            if product.product_type == ProductType.DEBIT_CARD:
+                if product.linked_product_id not in products:
+                    raise ValueError("Debit card must be linked to an account")
+                target_id = product.linked_product_id
+                if data.transaction_type == TransactionType.EXPENSE:
+                    # As in create_transaction, net of earlier rows of this batch
+                    linked_product = products[target_id]
+                    available = linked_product.balance + balance_changes.get(target_id, Decimal("0"))
+                    if available < data.amount:
+                        raise ValueError(
+                            f"Insufficient balance in linked account. "
+                            f"Available: ${float(available):.2f}"
+                        )
+            
+            balance_changes[target_id] = balance_changes.get(target_id, Decimal("0")) + balance_change
+            new_rows = self._build_transaction_rows(data, user_id)
+            ledger_changes.append(BalanceChange(target_id, balance_change, data.date, new_rows[0]["id"]))
+            rows.extend(new_rows)
+        
+        all_transactions = await self._insert_transactions(rows)
+        await self._apply_balance_changes(balance_changes, products)
+        await self.ledger.record(ledger_changes)
+        items = self._new_statement_items(all_transactions, products)
+        await self.statements.apply_changes(items)
+        installment_ids = {t.id for t in all_transactions if t.installment_id}
+        await self.projections.apply_changes(
+            item for item in items if item.transaction_id in installment_ids
+        )
         await self.db.commit()
-        
-        # Refresh all transactions
-        for transaction in all_transactions:
-            await self.db.refresh(transaction)
+        await self._invalidate_caches(user_id, list(products) + list(balance_changes))
         
         return all_transactions
     
@@ -487,43 +838,78 @@ class TransactionService:
         user_id: UUID,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        product_id: Optional[UUID] = None
-    ) -> Dict[str, Decimal]:
+        product_id: Optional[UUID] = None,
+        group_by: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Get summary statistics for transactions in a date range.
         Returns totals for income, expenses, and transfers.
+        
+        Totals are aggregated in SQL, so only a handful of numbers travel
+        over the wire. Pass group_by (day, week, month, category or product)
+        to also get a "breakdown" list with the same totals per group.
         """
-        query = select(Transaction).where(Transaction.user_id == user_id)
+        if group_by is not None and group_by not in SUMMARY_GROUPINGS:
+            raise ValueError(
+                f"group_by must be one of {sorted(SUMMARY_GROUPINGS)}"
+            )
         
+        filters = [Transaction.user_id == user_id]
         if start_date:
-            query = query.where(Transaction.date >= start_date)
+            filters.append(Transaction.date >= start_date)
         if end_date:
-            query = query.where(Transaction.date <= end_date)
+            filters.append(Transaction.date <= end_date)
         if product_id:
-            query = query.where(
+            filters.append(
                 (Transaction.from_product_id == product_id) |
                 (Transaction.to_product_id == product_id)
             )
         
-        result = await self.db.execute(query)
-        transactions = result.scalars().all()
-        
-        summary = {
-            "total_income": Decimal("0"),
-            "total_expense": Decimal("0"),
-            "total_transfer": Decimal("0"),
-            "net_change": Decimal("0"),
-        }
-        
-        for transaction in transactions:
-            amount = transaction.amount
-            if transaction.transaction_type == TransactionType.INCOME:
-                summary["total_income"] += amount
-                summary["net_change"] += amount
-            elif transaction.transaction_type == TransactionType.EXPENSE:
-                summary["total_expense"] += amount
-                summary["net_change"] -= amount
-            elif transaction.transaction_type == TransactionType.TRANSFER:
-                summary["total_transfer"] += amount
+        totals = self._summary_columns()
+        result = await self.db.execute(select(*totals).where(*filters))
+        summary = self._summary_row(result.one())
+        
+        if group_by:
+            group_key = SUMMARY_GROUPINGS[group_by]().label("key")
+            result = await self.db.execute(
+                select(group_key, *totals)
+                .where(*filters)
+                .group_by(group_key)
+                .order_by(group_key)
+            )
+            summary["breakdown"] = [
+                {"key": row.key, **self._summary_row(row)}
+                for row in result
+            ]
         
         return summary
+    
+    @staticmethod
+    def _summary_columns() -> list:
+        """Conditional SUM(...) FILTER (WHERE transaction_type = ...) columns."""
+        def total_of(transaction_type: TransactionType, label: str):
+            return func.coalesce(
+                func.sum(Transaction.amount).filter(
+                    Transaction.transaction_type == transaction_type.value
+                ),
+                0,
+            ).label(label)
+        
+        return [
+            total_of(TransactionType.INCOME, "total_income"),
+            total_of(TransactionType.EXPENSE, "total_expense"),
+            total_of(TransactionType.TRANSFER, "total_transfer"),
+        ]
+    
+    @staticmethod
+    def _summary_row(row) -> Dict[str, Decimal]:
+        """Turn an aggregated row into the summary dict shape."""
+        total_income = Decimal(row.total_income)
+        total_expense = Decimal(row.total_expense)
+        return {
+            "total_income": total_income,
+            "total_expense": total_expense,
+            "total_transfer": Decimal(row.total_transfer),
+            "net_change": total_income - total_expense,
+        }
+
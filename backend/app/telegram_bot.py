@@ -164,6 +164,16 @@ def _format_transactions(transactions) -> str:
     return text
 
 
+def _more_keyboard(next_cursor: Optional[str]):
+    """Keyboard with a "see more" button carrying the next page cursor."""
+    if not next_cursor:
+        return None
+    kb = InlineKeyboardBuilder()
+    # Cursors are 32 chars, well within Telegram's 64-byte callback_data limit
+    kb.button(text="⏬ Ver más", callback_data=f"ultimos:{next_cursor}")
+    return kb.as_markup()
+
+
 def _parse_amount(text: str) -> Optional[Decimal]:
     """Try to parse a number from text. Returns Decimal or None."""
     cleaned = text.strip().replace("$", "").replace(",", ".")
@@ -309,14 +319,14 @@ async def cmd_ultimos(message: types.Message):
 
     async with AsyncSessionLocal() as db:
         service = TransactionService(db)
-        transactions = await service.get_transactions(user_id=user_id, limit=5)
+        transactions, next_cursor = await service.get_transactions_page(user_id=user_id, limit=5)
 
     if not transactions:
         await message.answer("No tenés transacciones todavía.")
         return
 
     text = _format_transactions(transactions)
-    await message.answer(text, parse_mode="Markdown")
+    await message.answer(text, reply_markup=_more_keyboard(next_cursor), parse_mode="Markdown")
 
 
 # ===========================================================================
@@ -1135,7 +1145,7 @@ async def on_action_ultimos(callback: CallbackQuery):
 
     async with AsyncSessionLocal() as db:
         service = TransactionService(db)
-        transactions = await service.get_transactions(user_id=user_id, limit=5)
+        transactions, next_cursor = await service.get_transactions_page(user_id=user_id, limit=5)
 
     if not transactions:
         await callback.message.answer("No tenés transacciones todavía.")
@@ -1145,13 +1155,44 @@ async def on_action_ultimos(callback: CallbackQuery):
 
     # Add action buttons
     kb = InlineKeyboardBuilder()
+    if next_cursor:
+        kb.button(text="⏬ Ver más", callback_data=f"ultimos:{next_cursor}")
     kb.button(text="📝 Nuevo registro", callback_data="action:new")
     kb.button(text="📊 Ver resumen", callback_data="action:resumen")
-    kb.adjust(2)
+    if next_cursor:
+        kb.adjust(1, 2)
+    else:
+        kb.adjust(2)
 
     await callback.message.answer(text, reply_markup=kb.as_markup(), parse_mode="Markdown")
 
 
+@router.callback_query(F.data.startswith("ultimos:"))
+async def on_ultimos_more(callback: CallbackQuery):
+    """Show the next page of transactions."""
+    await callback.answer()
+    await callback.message.edit_reply_markup(reply_markup=None)
+    cursor = callback.data.split(":", 1)[1]
+    user_id = await _get_user_id()
+
+    async with AsyncSessionLocal() as db:
+        service = TransactionService(db)
+        try:
+            transactions, next_cursor = await service.get_transactions_page(
+                user_id=user_id, limit=5, cursor=cursor
+            )
+        except ValueError:
+            await callback.message.answer("❌ No pude cargar más movimientos.")
+            return
+
+    if not transactions:
+        await callback.message.answer("No hay más transacciones.")
+        return
+
+    text = _format_transactions(transactions)
+    await callback.message.answer(text, reply_markup=_more_keyboard(next_cursor), parse_mode="Markdown")
+
+
 # ---------------------------------------------------------------------------
 # Bot lifecycle
 # ---------------------------------------------------------------------------
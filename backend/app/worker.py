@@ -0,0 +1,251 @@
+"""
+Background job worker.
+
+Runs jobs queued in the `jobs` table (see app.services.job_service).
+Either as a long-running local process:
+
+    python -m app.worker
+
+or one batch at a time from the cron-triggered /api/jobs/run endpoint.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models import Job
+from app.services.job_service import JOB_LOCK_TIMEOUT, JobLockLost, JobService
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+# kind -> handler; handlers receive the decoded payload
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+# Kinds enqueued once per UTC day by schedule_periodic()
+DAILY_JOBS = ["ledger_snapshot", "ledger_reconcile", "statement_build"]
+
+# Minimum seconds between lock renewals from heartbeat()
+HEARTBEAT_INTERVAL = JOB_LOCK_TIMEOUT / 5
+
+# The job run_job() is running, with the time of its last heartbeat
+_current_job: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_job", default=None)
+
+
+def job_handler(kind: str):
+    """Register a coroutine as the handler for a job kind."""
+    def decorator(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+async def run_job(job: Job) -> None:
+    """Run a claimed job and record its outcome."""
+    payload = json.loads(job.payload) if job.payload else {}
+    handler = JOB_HANDLERS.get(job.kind)
+    _current_job.set({"job": job, "beat_at": time.monotonic()})
+
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind '{job.kind}'")
+        result = await handler(payload)
+    except JobLockLost as e:
+        # Another worker owns the job now; its outcome is theirs to record
+        logger.warning(f"Job {job.id} ({job.kind}) abandoned: {e}")
+        return
+    except Exception as e:
+        logger.error(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}: {e}", exc_info=True)
+        async with AsyncSessionLocal() as db:
+            will_retry = await JobService(db).fail(job, f"{type(e).__name__}: {e}"[:2000])
+        if not will_retry:
+            try:
+                await _notify_failure(payload)
+            except Exception as notify_error:
+                logger.error(f"Job {job.id}: failure notification failed: {notify_error}")
+        return
+
+    if _current_job.get().get("completed"):
+        return  # The handler completed it atomically with its own writes
+    async with AsyncSessionLocal() as db:
+        await JobService(db).complete(job, result)
+
+
+async def complete_current_job(db: AsyncSession, result: Any) -> None:
+    """
+    Mark the running job DONE in `db`'s open transaction, so the handler's
+    writes and the completion commit together: a crash or failed
+    notification afterwards can't make the job run (and write) again.
+    """
+    current = _current_job.get()
+    if current is None:
+        return
+    await JobService(db).complete_with(current["job"], result)
+    current["completed"] = True
+
+
+async def heartbeat() -> None:
+    """
+    Renew the lock of the job being run, so a long job isn't reclaimed by
+    another worker. Handlers call it from progress callbacks; calls more
+    often than HEARTBEAT_INTERVAL are no-ops.
+    
+    Raises JobLockLost if the job was reclaimed meanwhile: the handler must
+    stop (rolling back) rather than race the new attempt.
+    """
+    current = _current_job.get()
+    if current is None or time.monotonic() - current["beat_at"] < HEARTBEAT_INTERVAL:
+        return
+    current["beat_at"] = time.monotonic()
+    async with AsyncSessionLocal() as db:
+        if not await JobService(db).heartbeat(current["job"]):
+            raise JobLockLost(f"Job {current['job'].id} lost its lock while running")
+
+
+async def run_pending(max_jobs: int = 10, time_budget: Optional[float] = None) -> int:
+    """
+    Claim and run jobs one at a time until the queue is empty, `max_jobs`
+    have run, or `time_budget` seconds have elapsed. Returns jobs run.
+    """
+    started = time.monotonic()
+    processed = 0
+
+    while processed < max_jobs:
+        if time_budget is not None and time.monotonic() - started >= time_budget:
+            break
+
+        async with AsyncSessionLocal() as db:
+            jobs = await JobService(db).claim(limit=1)
+        if not jobs:
+            break
+
+        await run_job(jobs[0])
+        processed += 1
+
+    return processed
+
+
+async def schedule_periodic() -> int:
+    """
+    Enqueue today's periodic jobs. Cheap to call often: the dedupe key
+    makes every call after the first one a no-op. Returns jobs enqueued.
+    """
+    today = datetime.now(timezone.utc).date().isoformat()
+    enqueued = 0
+    async with AsyncSessionLocal() as db:
+        for kind in DAILY_JOBS:
+            if await JobService(db).enqueue(kind, {}, dedupe_key=f"{kind}:{today}"):
+                enqueued += 1
+    return enqueued
+
+
+async def run_forever(poll_interval: float = 2.0, schedule_interval: float = 300.0) -> None:
+    """Worker loop for running as a local process."""
+    from app.http_client import close_http_client
+
+    logger.info("Job worker started")
+    scheduled_at = None
+    try:
+        while True:
+            try:
+                if scheduled_at is None or time.monotonic() - scheduled_at >= schedule_interval:
+                    await schedule_periodic()
+                    scheduled_at = time.monotonic()
+                processed = await run_pending()
+            except Exception as e:
+                logger.error(f"Job worker error: {e}", exc_info=True)
+                processed = 0
+            if not processed:
+                await asyncio.sleep(poll_interval)
+    finally:
+        await close_http_client()
+
+
+async def _notify_failure(payload: Dict[str, Any]) -> None:
+    """Tell the Telegram chat that started a job that it gave up."""
+    chat_id = payload.get("chat_id")
+    if not chat_id:
+        return
+    from app.routers.telegram import send_telegram_message
+
+    await send_telegram_message(chat_id, "❌ No pude procesar tu archivo. Probá de nuevo más tarde.")
+
+
+# ---------------------------------------------------------------------------
+# Handlers
+# ---------------------------------------------------------------------------
+@job_handler("csv_import")
+async def handle_csv_import(payload: Dict[str, Any]) -> Dict[str, int]:
+    """Import a CSV document sent to the Telegram bot."""
+    from app.routers.telegram import import_csv_document, send_telegram_message
+    from app.services.import_service import ImportResult
+
+    chat_id = payload["chat_id"]
+
+    async def notify(text: str) -> None:
+        # Best effort: a Telegram failure must not fail (and re-run) the import
+        try:
+            await send_telegram_message(chat_id, text)
+        except Exception as e:
+            logger.error(f"CSV import: Telegram notification failed: {e}")
+
+    async def report_progress(imported: int) -> None:
+        await heartbeat()
+        await notify(f"⏳ {imported} transacciones importadas...")
+
+    async def mark_done(result: ImportResult) -> None:
+        await complete_current_job(db, {"imported": result.imported, "errors": result.errors})
+
+    async with AsyncSessionLocal() as db:
+        result = await import_csv_document(
+            db, UUID(payload["user_id"]), payload["file_id"], report_progress, mark_done
+        )
+
+    msg = f"✅ CSV procesado: *{result.imported}* transacciones guardadas."
+    if result.errors:
+        msg += f"\n⚠️ {result.errors} filas con errores."
+    await notify(msg)
+    return {"imported": result.imported, "errors": result.errors}
+
+
+@job_handler("ledger_snapshot")
+async def handle_ledger_snapshot(payload: Dict[str, Any]) -> Dict[str, int]:
+    """Snapshot every product's balance so historical lookups stay short."""
+    from app.services.ledger_service import LedgerService
+
+    async with AsyncSessionLocal() as db:
+        written = await LedgerService(db).take_snapshots()
+    return {"snapshots": written}
+
+
+@job_handler("ledger_reconcile")
+async def handle_ledger_reconcile(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Check stored balances against the ledger; drift ends up in the job result."""
+    from app.services.ledger_service import LedgerService
+
+    async with AsyncSessionLocal() as db:
+        drifts = await LedgerService(db).reconcile()
+    return {"drifts": drifts}
+
+
+@job_handler("statement_build")
+async def handle_statement_build(payload: Dict[str, Any]) -> Dict[str, int]:
+    """Refresh every credit card's current statement and close finished cycles."""
+    from app.services.statement_service import StatementService
+
+    async with AsyncSessionLocal() as db:
+        return await StatementService(db).build_all()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_forever())
@@ -0,0 +1,102 @@
+"""
+Benchmark: batch_create_transactions vs. one create_transaction per row.
+
+Creates a throwaway user with a cash account, inserts the same batch through
+both paths and reports wall time and SQL statements issued. Everything is
+deleted at the end (the user row cascades).
+
+Usage (from backend/):
+    python -m scripts.bench_batch_insert --rows 500
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import delete, event
+
+from app.database import AsyncSessionLocal, engine
+from app.models import FinancialProduct, ProductType, TransactionType, User
+from app.schemas import TransactionCreate
+from app.services.transaction_service import TransactionService
+
+
+class StatementCounter:
+    """Counts statements sent to the database while enabled."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def reset(self) -> None:
+        self.count = 0
+
+
+def _build_batch(product_id: uuid.UUID, rows: int) -> list[TransactionCreate]:
+    now = datetime.now(timezone.utc)
+    return [
+        TransactionCreate(
+            amount=Decimal("10.00") + i,
+            date=now - timedelta(minutes=i),
+            description=f"bench {i}",
+            transaction_type=TransactionType.INCOME.value,
+            from_product_id=product_id,
+        )
+        for i in range(rows)
+    ]
+
+
+async def main(rows: int) -> None:
+    counter = StatementCounter()
+    user_id = uuid.uuid4()
+    product_id = uuid.uuid4()
+
+    async with AsyncSessionLocal() as db:
+        db.add(User(id=user_id, email=f"bench_{user_id.hex[:8]}@example.com", name="Bench"))
+        await db.flush()
+        db.add(FinancialProduct(
+            id=product_id,
+            name="Bench cash",
+            product_type=ProductType.CASH.value,
+            user_id=user_id,
+        ))
+        await db.commit()
+
+    try:
+        batch = _build_batch(product_id, rows)
+
+        async with AsyncSessionLocal() as db:
+            service = TransactionService(db)
+            counter.reset()
+            start = time.perf_counter()
+            for data in batch:
+                await service.create_transaction(data, user_id)
+            per_row = time.perf_counter() - start, counter.count
+
+        async with AsyncSessionLocal() as db:
+            service = TransactionService(db)
+            counter.reset()
+            start = time.perf_counter()
+            await service.batch_create_transactions(batch, user_id)
+            bulk = time.perf_counter() - start, counter.count
+
+        print(f"rows={rows}")
+        print(f"create_transaction x{rows}:   {per_row[0]*1000:9.1f} ms  {per_row[1]:6d} statements")
+        print(f"batch_create_transactions: {bulk[0]*1000:9.1f} ms  {bulk[1]:6d} statements")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500)
+    asyncio.run(main(parser.parse_args().rows))
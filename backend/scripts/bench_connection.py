@@ -0,0 +1,81 @@
+"""
+Benchmark: per-request connection overhead for each DB_POOL_MODE.
+
+For every pool mode an engine is built with the same options the app uses
+(app.database.engine_options) and --requests sequential "requests" are
+made, each checking out a session, running SELECT 1 and closing it. Reports
+the first (cold) request, the median and p95 of the rest, and how many new
+connections were opened, with the average DNS / TCP / TLS / auth split of
+those connections (set DB_CONNECT_TELEMETRY=true for a separate DNS figure)
+and how many resumed a TLS session. No data is written.
+
+Usage (from backend/):
+    python -m scripts.bench_connection --requests 50
+    python -m scripts.bench_connection --modes null serverless
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import clean_url, connect_args, connect_timings, engine_options, uses_pgbouncer
+
+
+async def bench(mode: str, requests: int) -> None:
+    options = engine_options(clean_url, connect_args, pool_mode=mode)
+    options["echo"] = False
+    engine = create_async_engine(clean_url, **options)
+    connects = 0
+
+    def on_connect(*args):
+        nonlocal connects
+        connects += 1
+
+    event.listen(engine.sync_engine, "connect", on_connect)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    timings: List[float] = []
+    connect_timings.clear()
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            async with sessions() as db:
+                await db.execute(text("SELECT 1"))
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        await engine.dispose()
+
+    warm = sorted(timings[1:]) or timings
+    p95 = warm[min(len(warm) - 1, int(len(warm) * 0.95))]
+    print(
+        f"{mode:10s}  cold {timings[0]:8.1f} ms  median {statistics.median(warm):8.1f} ms  "
+        f"p95 {p95:8.1f} ms  connections opened {connects:4d}"
+    )
+    if connect_timings:
+        def avg(phase: str) -> str:
+            values = [t[phase] for t in connect_timings if t[phase] is not None]
+            return f"{sum(values) / len(values):7.1f}" if values else "    n/a"
+        resumed = sum(1 for t in connect_timings if t["tls_resumed"])
+        print(
+            f"{'':10s}  per connect: dns {avg('dns_ms')}  tcp {avg('tcp_ms')}  tls {avg('tls_ms')}  "
+            f"auth {avg('auth_ms')}  total {avg('total_ms')} ms  tls resumed {resumed}/{len(connect_timings)}"
+        )
+
+
+async def main(modes: List[str], requests: int) -> None:
+    print(f"requests={requests} pgbouncer={uses_pgbouncer(clean_url)}")
+    for mode in modes:
+        await bench(mode, requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", default=["null", "serverless", "queue"])
+    args = parser.parse_args()
+    asyncio.run(main(args.modes, args.requests))
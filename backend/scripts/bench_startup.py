@@ -0,0 +1,91 @@
+"""
+Benchmark: cold start time for each STARTUP_MODE.
+
+Every run is a fresh Python process (like a serverless cold start) that
+imports app.main and enters the app's lifespan, i.e. does exactly the
+startup work a first request waits for. Reports import and startup time per
+mode. Also warns when app.database.SCHEMA_REVISION is not the head of
+alembic/versions, since the "check" mode compares against it.
+
+Usage (from backend/):
+    python -m scripts.bench_startup --runs 5
+    python -m scripts.bench_startup --modes check trust
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in the child process; prints one JSON line with the timings
+CHILD = """
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+started = asyncio.run(startup())
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (started - imported) * 1000}))
+"""
+
+
+def alembic_head() -> Optional[str]:
+    """The revision no other migration revises, read from alembic/versions."""
+    revisions, parents = set(), set()
+    for path in (BACKEND_DIR / "alembic" / "versions").glob("*.py"):
+        source = path.read_text()
+        revision = re.search(r"^revision: str = '([^']+)'", source, re.M)
+        down = re.search(r"^down_revision: Union\[str, None\] = '([^']+)'", source, re.M)
+        if revision:
+            revisions.add(revision.group(1))
+        if down:
+            parents.add(down.group(1))
+    heads = revisions - parents
+    return heads.pop() if len(heads) == 1 else None
+
+
+def run(mode: str) -> Dict[str, float]:
+    env = dict(os.environ, STARTUP_MODE=mode, DEBUG="false")
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(modes: List[str], runs: int) -> None:
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.database import SCHEMA_REVISION
+
+    head = alembic_head()
+    if head != SCHEMA_REVISION:
+        print(f"WARNING: SCHEMA_REVISION is {SCHEMA_REVISION} but the Alembic head is {head}")
+
+    print(f"runs={runs}")
+    for mode in modes:
+        samples = [run(mode) for _ in range(runs)]
+        imports = [s["import_ms"] for s in samples]
+        startups = [s["startup_ms"] for s in samples]
+        print(
+            f"{mode:10s}  import median {statistics.median(imports):8.1f} ms  "
+            f"startup median {statistics.median(startups):8.1f} ms  max {max(startups):8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["create_all", "check", "trust"])
+    args = parser.parse_args()
+    main(args.modes, args.runs)
@@ -0,0 +1,111 @@
+"""
+Check: the shared outbound HTTP client against a local mock server.
+
+Starts a mock Telegram-style API on 127.0.0.1 and verifies that
+app.http_client:
+
+- retries a 429 after the server's parameters.retry_after,
+- returns a 429 whose retry_after exceeds HTTP_MAX_RETRY_DELAY at once,
+- sends sequential requests over one kept-alive connection.
+
+Exits with status 1 on the first failed check.
+
+Usage (from backend/):
+    python -m scripts.check_http_client
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.http_client import close_http_client, request
+
+
+class MockTelegram(BaseHTTPRequestHandler):
+    """
+    /limited/<n>/<retry_after>: 429 for the first n calls, then 200.
+    Every response reports the client port it arrived on.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    calls = {}
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        status, body = 200, {"ok": True}
+        if parts[0] == "limited":
+            limit, retry_after = int(parts[1]), float(parts[2])
+            seen = self.calls[self.path] = self.calls.get(self.path, 0) + 1
+            if seen <= limit:
+                status = 429
+                body = {"ok": False, "error_code": 429, "parameters": {"retry_after": retry_after}}
+        body["port"] = self.client_address[1]
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def check(name: str, ok: bool, detail: str) -> bool:
+    print(f"{'ok  ' if ok else 'FAIL'}  {name}: {detail}")
+    return ok
+
+
+async def run(base: str, requests: int) -> bool:
+    ok = True
+    try:
+        start = time.perf_counter()
+        response = await request("GET", f"{base}/limited/2/0.2")
+        elapsed = time.perf_counter() - start
+        ok &= check(
+            "retry_after is honoured",
+            response.status_code == 200 and elapsed >= 0.4,
+            f"status {response.status_code} after {elapsed:.2f}s (2 x 0.2s expected)",
+        )
+
+        start = time.perf_counter()
+        response = await request("GET", f"{base}/limited/1/3600")
+        elapsed = time.perf_counter() - start
+        ok &= check(
+            "long retry_after is not waited for",
+            response.status_code == 429 and elapsed < 1,
+            f"status {response.status_code} after {elapsed:.2f}s",
+        )
+
+        ports = set()
+        for _ in range(requests):
+            ports.add((await request("GET", f"{base}/ok")).json()["port"])
+        ok &= check(
+            "connections are reused",
+            len(ports) == 1,
+            f"{requests} sequential requests over {len(ports)} connection(s)",
+        )
+    finally:
+        await close_http_client()
+    return ok
+
+
+def main(requests: int) -> int:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockTelegram)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        ok = asyncio.run(run(f"http://127.0.0.1:{server.server_port}", requests))
+    finally:
+        server.shutdown()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(main(args.requests))
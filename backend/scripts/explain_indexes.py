@@ -0,0 +1,235 @@
+"""
+Check that the service-layer transaction queries are served by indexes.
+
+Seeds a throwaway user with --rows transactions spread over a credit card,
+a cash account, a few categories and installment plans, then runs each
+query through the real service method. The SQL it issues is captured and
+re-run under EXPLAIN (FORMAT JSON) with sequential scans disabled, and the
+plan must use one of the indexes expected for that query shape.
+Everything is deleted at the end (the user row cascades).
+
+Exits with status 1 if any query is not served by an expected index.
+
+Usage (from backend/):
+    python -m scripts.explain_indexes --rows 20000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+from sqlalchemy import delete, event, insert
+
+from app.database import AsyncSessionLocal, engine
+from app.models import Category, FinancialProduct, ProductType, Transaction, TransactionType, User
+from app.services.transaction_service import TransactionService, encode_cursor
+
+
+class StatementRecorder:
+    """Records (sql, parameters) of SELECTs sent to the database while enabled."""
+
+    def __init__(self):
+        self.enabled = False
+        self.statements: List[Tuple[str, Any]] = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled and statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+
+def _plan_nodes(node: Dict[str, Any]):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+async def explain(sql: str, parameters: Any) -> Tuple[Set[str], bool]:
+    """Index names used by a statement's plan, and whether it seq-scans transactions."""
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", parameters)
+        plan = result.scalar()
+        await conn.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    indexes = set()
+    seq_scan = False
+    for node in _plan_nodes(plan[0]["Plan"]):
+        if "Index Name" in node:
+            indexes.add(node["Index Name"])
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") == "transactions":
+            seq_scan = True
+    return indexes, seq_scan
+
+
+async def seed(user_id: uuid.UUID, rows: int) -> Dict[str, Any]:
+    """Create the user, products, categories and transactions to query."""
+    card_id, account_id = uuid.uuid4(), uuid.uuid4()
+    category_ids = [uuid.uuid4() for _ in range(8)]
+    now = datetime.now(timezone.utc)
+
+    async with AsyncSessionLocal() as db:
+        db.add(User(id=user_id, email=f"explain_{user_id.hex[:8]}@example.com", name="Explain"))
+        await db.flush()
+        db.add_all([
+            FinancialProduct(
+                id=card_id, name="Explain card", product_type=ProductType.CREDIT_CARD.value,
+                user_id=user_id, closing_day=25, due_day=5,
+            ),
+            FinancialProduct(
+                id=account_id, name="Explain cash", product_type=ProductType.CASH.value,
+                user_id=user_id,
+            ),
+        ])
+        db.add_all([
+            Category(id=category_id, name=f"Explain {i}", user_id=user_id)
+            for i, category_id in enumerate(category_ids)
+        ])
+        await db.flush()
+
+        batch = []
+        installment_id = None
+        for i in range(rows):
+            kind = random.random()
+            row = {
+                "id": uuid.uuid4(),
+                "amount": Decimal(random.randint(100, 100000)).scaleb(-2),
+                "date": now - timedelta(hours=i) + timedelta(days=180 if kind < 0.1 else 0),
+                "description": f"explain {i}",
+                "category_id": random.choice(category_ids + [None]),
+                "user_id": user_id,
+                "transaction_type": TransactionType.EXPENSE.value,
+                "from_product_id": card_id,
+            }
+            if kind < 0.1:
+                # Installment plans of 6, future dated
+                if i % 6 == 0 or installment_id is None:
+                    installment_id = uuid.uuid4()
+                row.update(installment_id=installment_id, installment_number=i % 6 + 1, installment_total=6)
+            elif kind < 0.4:
+                row.update(transaction_type=TransactionType.INCOME.value, from_product_id=None, to_product_id=account_id)
+            elif kind < 0.5:
+                row.update(transaction_type=TransactionType.TRANSFER.value, from_product_id=account_id, to_product_id=card_id)
+            batch.append(row)
+            if len(batch) == 1000:
+                await db.execute(insert(Transaction), batch)
+                batch = []
+        if batch:
+            await db.execute(insert(Transaction), batch)
+        await db.commit()
+
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("ANALYZE transactions")
+        await conn.commit()
+
+    return {
+        "user_id": user_id,
+        "card_id": card_id,
+        "account_id": account_id,
+        "category_id": category_ids[0],
+        "installment_id": installment_id,
+        "cursor": encode_cursor(now - timedelta(days=30), uuid.UUID(int=0)),
+        "start": now - timedelta(days=90),
+        "end": now,
+    }
+
+
+# (name, service call, indexes any of which must serve the query)
+CASES: List[Tuple[str, Callable[[TransactionService, Dict[str, Any]], Awaitable[Any]], Set[str]]] = [
+    (
+        "get_transactions",
+        lambda s, c: s.get_transactions(c["user_id"]),
+        {"ix_transactions_user_date_id"},
+    ),
+    (
+        "get_transactions(product_id)",
+        lambda s, c: s.get_transactions(c["user_id"], product_id=c["card_id"]),
+        {"ix_transactions_from_product_date"},
+    ),
+    (
+        "get_transactions(category_id)",
+        lambda s, c: s.get_transactions(c["user_id"], category_id=c["category_id"]),
+        {"ix_transactions_category_date"},
+    ),
+    (
+        "get_transactions(transaction_type)",
+        lambda s, c: s.get_transactions(c["user_id"], transaction_type=TransactionType.INCOME.value),
+        {"ix_transactions_user_type_date"},
+    ),
+    (
+        "get_transactions_page(cursor)",
+        lambda s, c: s.get_transactions_page(c["user_id"], cursor=c["cursor"]),
+        {"ix_transactions_user_date_id"},
+    ),
+    (
+        "get_transaction_summary",
+        lambda s, c: s.get_transaction_summary(c["user_id"], start_date=c["start"], end_date=c["end"]),
+        {"ix_transactions_user_date_id"},
+    ),
+    (
+        "get_transaction_summary(product_id)",
+        lambda s, c: s.get_transaction_summary(c["user_id"], product_id=c["account_id"]),
+        # BitmapOr over the product indexes, or the user's date range
+        {"ix_transactions_from_product_date", "ix_transactions_to_product_date", "ix_transactions_user_date_id"},
+    ),
+    (
+        "get_outstanding_installments",
+        lambda s, c: s.get_outstanding_installments(c["user_id"]),
+        {"ix_transactions_user_installments"},
+    ),
+    (
+        "get_installment_group",
+        lambda s, c: s.get_installment_group(c["installment_id"], c["user_id"]),
+        {"ix_transactions_installment"},
+    ),
+]
+
+
+async def main(rows: int) -> int:
+    recorder = StatementRecorder()
+    user_id = uuid.uuid4()
+    try:
+        context = await seed(user_id, rows)
+        failures = []
+        for name, call, expected in CASES:
+            async with AsyncSessionLocal() as db:
+                recorder.statements = []
+                recorder.enabled = True
+                await call(TransactionService(db), context)
+                recorder.enabled = False
+
+            # Every SELECT the method issued against transactions must be served
+            for sql, parameters in recorder.statements:
+                if "FROM transactions" not in sql:
+                    continue
+                used, seq_scan = await explain(sql, parameters)
+                ok = bool(used & expected) and not seq_scan
+                print(f"{'ok  ' if ok else 'FAIL'} {name:40s} {', '.join(sorted(used)) or 'seq scan'}")
+                if not ok:
+                    failures.append(name)
+
+        if failures:
+            print(f"FAIL: {len(failures)} quer{'y' if len(failures) == 1 else 'ies'} not served by the expected index")
+            return 1
+        print("OK")
+        return 0
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.rows)))
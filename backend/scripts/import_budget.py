@@ -0,0 +1,107 @@
+"""
+Import-time budget for the serverless entry point.
+
+Imports app.main the way api/index.py does, in fresh processes under
+python -X importtime, and reports the total and the most expensive
+modules. Fails (exit status 1) when:
+
+- the best of --runs totals exceeds --budget-ms,
+- a FORBIDDEN module (bot / parsing / data libraries) is imported, or
+- a DEFERRED module, which the API only needs once a request arrives for
+  it, is imported at startup.
+
+The last report is kept in scripts/importtime_report.txt; refresh it with
+--output when the budget or the import graph changes on purpose.
+
+Usage (from backend/):
+    python -m scripts.import_budget
+    python -m scripts.import_budget --budget-ms 800 --output scripts/importtime_report.txt
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Default budget for importing app.main, measured with -X importtime
+# (which itself adds overhead) on a developer machine
+BUDGET_MS = 800
+
+# Never on the API path
+FORBIDDEN = ("aiogram", "dateparser", "pandas")
+
+# Loaded on first use: routers by LazyRouters, the rest from inside them
+DEFERRED = ("app.routers.", "app.services", "app.models", "app.schemas", "sqlalchemy", "httpx", "jwt")
+
+
+def profile() -> List[Tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) for every module app.main imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def matches(name: str, prefixes: Tuple[str, ...]) -> bool:
+    return any(name == p.rstrip(".") or name.startswith(p if p.endswith(".") else p + ".") for p in prefixes)
+
+
+def main(budget_ms: float, runs: int, top: int, output: str) -> int:
+    profiles = [profile() for _ in range(runs)]
+    totals = [sum(cumulative for _, _, cumulative, depth in p if depth == 0) / 1000 for p in profiles]
+    best = min(range(runs), key=lambda i: totals[i])
+    modules = profiles[best]
+
+    lines = [f"import app.main: {totals[best]:.1f} ms (best of {runs}), budget {budget_ms:.0f} ms", ""]
+    lines.append(f"Top {top} by cumulative time (top-level imports):")
+    for name, _, cumulative, depth in sorted(
+        (m for m in modules if m[3] <= 1), key=lambda m: m[2], reverse=True
+    )[:top]:
+        lines.append(f"  {cumulative / 1000:8.1f} ms  {'  ' * depth}{name}")
+    lines.append("")
+    lines.append(f"Top {top} by self time:")
+    for name, self_us, _, _ in sorted(modules, key=lambda m: m[1], reverse=True)[:top]:
+        lines.append(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if totals[best] > budget_ms:
+        failures.append(f"over budget: {totals[best]:.1f} ms > {budget_ms:.0f} ms")
+    names = [name for name, _, _, _ in modules]
+    forbidden = sorted({n for n in names if matches(n, FORBIDDEN)})
+    if forbidden:
+        failures.append(f"forbidden modules imported: {', '.join(forbidden)}")
+    deferred = sorted({n for n in names if matches(n, DEFERRED)})
+    if deferred:
+        failures.append(f"deferred modules imported at startup: {', '.join(deferred[:10])}")
+
+    lines.append("")
+    lines.extend(f"FAIL: {failure}" for failure in failures)
+    if not failures:
+        lines.append("OK")
+    report = "\n".join(lines)
+    print(report)
+
+    if output:
+        Path(output).write_text(report + "\n")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", default="")
+    args = parser.parse_args()
+    sys.exit(main(args.budget_ms, args.runs, args.top, args.output))
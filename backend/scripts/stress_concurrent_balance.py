@@ -0,0 +1,142 @@
+"""
+Stress test: concurrent writers on the same accounts must not lose updates.
+
+Creates a throwaway user with two cash accounts and fires --writers
+concurrent tasks, each doing --ops writes on its own session: income into
+account A, and transfers A -> B and B -> A (opposite lock orders on
+purpose, to surface deadlocks). At the end the stored balances must match
+what the successful operations imply and the balance ledger. Everything is
+deleted at the end (the user row cascades).
+
+Exits with status 1 on any mismatch.
+
+Usage (from backend/):
+    python -m scripts.stress_concurrent_balance --writers 20 --ops 25
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import delete, select, func
+
+from app.database import AsyncSessionLocal, engine
+from app.models import BalanceLedgerEntry, FinancialProduct, ProductType, TransactionType, User
+from app.schemas import TransactionCreate, TransferCreate
+from app.services.transaction_service import TransactionService
+
+AMOUNT = Decimal("1.00")
+
+
+async def writer(account_a: uuid.UUID, account_b: uuid.UUID, user_id: uuid.UUID, ops: int, totals: dict) -> None:
+    """Run `ops` random writes, recording the ones that committed."""
+    async with AsyncSessionLocal() as db:
+        service = TransactionService(db)
+        for _ in range(ops):
+            op = random.choice(["income", "a_to_b", "b_to_a"])
+            try:
+                if op == "income":
+                    await service.create_transaction(
+                        TransactionCreate(
+                            amount=AMOUNT,
+                            date=datetime.now(timezone.utc),
+                            description="stress income",
+                            transaction_type=TransactionType.INCOME.value,
+                            from_product_id=account_a,
+                        ),
+                        user_id,
+                    )
+                else:
+                    source, target = (account_a, account_b) if op == "a_to_b" else (account_b, account_a)
+                    await service.create_transfer(
+                        TransferCreate(
+                            amount=AMOUNT,
+                            date=datetime.now(timezone.utc),
+                            description="stress transfer",
+                            from_product_id=source,
+                            to_product_id=target,
+                        ),
+                        user_id,
+                    )
+                totals[op] += 1
+            except ValueError:
+                # Insufficient balance: the write was rejected as a whole
+                await db.rollback()
+                totals["rejected"] += 1
+
+
+async def main(writers: int, ops: int) -> int:
+    user_id = uuid.uuid4()
+    account_a = uuid.uuid4()
+    account_b = uuid.uuid4()
+
+    async with AsyncSessionLocal() as db:
+        db.add(User(id=user_id, email=f"stress_{user_id.hex[:8]}@example.com", name="Stress"))
+        await db.flush()
+        for product_id, name in ((account_a, "Stress A"), (account_b, "Stress B")):
+            db.add(FinancialProduct(
+                id=product_id,
+                name=name,
+                product_type=ProductType.CASH.value,
+                balance=Decimal("10.00"),
+                user_id=user_id,
+            ))
+        await db.commit()
+
+    try:
+        totals = {"income": 0, "a_to_b": 0, "b_to_a": 0, "rejected": 0}
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            writer(account_a, account_b, user_id, ops, totals) for _ in range(writers)
+        ))
+        elapsed = time.perf_counter() - start
+
+        expected_a = Decimal("10.00") + AMOUNT * (totals["income"] - totals["a_to_b"] + totals["b_to_a"])
+        expected_b = Decimal("10.00") + AMOUNT * (totals["a_to_b"] - totals["b_to_a"])
+
+        async with AsyncSessionLocal() as db:
+            balances = dict((await db.execute(
+                select(FinancialProduct.id, FinancialProduct.balance)
+                .where(FinancialProduct.id.in_([account_a, account_b]))
+            )).all())
+            ledger = dict((await db.execute(
+                select(BalanceLedgerEntry.product_id, func.sum(BalanceLedgerEntry.amount))
+                .where(BalanceLedgerEntry.product_id.in_([account_a, account_b]))
+                .group_by(BalanceLedgerEntry.product_id)
+            )).all())
+
+        committed = totals["income"] + totals["a_to_b"] + totals["b_to_a"]
+        print(f"writers={writers} ops={ops} committed={committed} rejected={totals['rejected']}")
+        print(f"elapsed: {elapsed*1000:.1f} ms ({committed / elapsed:.1f} writes/s)")
+
+        failures = []
+        for name, product_id, expected in (("A", account_a, expected_a), ("B", account_b, expected_b)):
+            # The ledger has no opening entry for the seeded 10.00
+            ledger_balance = Decimal("10.00") + ledger.get(product_id, Decimal("0"))
+            print(f"account {name}: balance={balances[product_id]} expected={expected} ledger={ledger_balance}")
+            if balances[product_id] != expected or ledger_balance != expected:
+                failures.append(name)
+
+        if failures:
+            print(f"FAIL: lost updates on account(s) {', '.join(failures)}")
+            return 1
+        print("OK")
+        return 0
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writers", type=int, default=20)
+    parser.add_argument("--ops", type=int, default=25)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.writers, args.ops)))